@@ -1,5 +1,18 @@
-from flask import Flask, request, jsonify, render_template_string
-from movie_search import search_movie_kinopoisk_api, create_direct_search_url
+from flask import Flask, Response, request, jsonify
+from movie_search import (
+    search_movies_batch, iter_search_movies_batch, DETAILS_MAX_FILMS, multi_source_search, SEARCH_MULTI_SOURCE,
+    build_direct_search_result, BATCH_MAX_TITLES, SEARCH_PAGE_SIZE, SEARCH_MAX_LIMIT,
+    search_cache, inflight_requests, cache_refresher, negative_cache, error_cache,
+    title_index, film_store, details_cache
+)
+from title_index import SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
+from http_utils import (
+    negotiate_stream, stream_headers, format_stream_event, compute_etag, etag_matches, JSON_MIMETYPE,
+    StaticPage, compress_response, add_vary, compressed_bodies, COMPRESS_MIN_SIZE,
+    serialize_json, response_cache
+)
+from upstream import api_breaker, api_key_pool, api_hedger, Deadline
+from search_response import search_results, search_cache_headers, search_response_ttl, iter_search_events
 import urllib.parse
 import os
 import time
@@ -104,6 +117,32 @@ HOME_TEMPLATE = """
             background-color: #2980b9;
         }
         
+        .search-box {
+            position: relative;
+        }
+        
+        .suggestions {
+            display: none;
+            position: absolute;
+            top: 100%;
+            left: 0;
+            right: 0;
+            z-index: 10;
+            background-color: var(--card-bg);
+            border: 1px solid #ddd;
+            border-radius: 0 0 4px 4px;
+            box-shadow: 0 4px 10px rgba(0,0,0,0.1);
+        }
+        
+        .suggestion {
+            padding: 8px 15px;
+            cursor: pointer;
+        }
+        
+        .suggestion:hover {
+            background-color: var(--light-bg);
+        }
+        
         .results-container {
             margin-top: 2rem;
         }
@@ -157,6 +196,15 @@ HOME_TEMPLATE = """
             margin-bottom: 0;
         }
         
+        .did-you-mean {
+            margin-bottom: 1rem;
+            color: #666;
+        }
+        
+        .did-you-mean a {
+            color: var(--secondary-color);
+        }
+        
         .direct-search-note {
             font-style: italic;
             color: var(--accent-color);
@@ -231,6 +279,7 @@ HOME_TEMPLATE = """
             <div class="search-box">
                 <input type="text" id="movie-name" class="search-input" placeholder="Введіть назву фільму або серіалу..." autofocus>
                 <button onclick="searchMovie()" class="search-button">Пошук</button>
+                <div id="suggestions" class="suggestions"></div>
             </div>
         </div>
         
@@ -252,39 +301,144 @@ HOME_TEMPLATE = """
             }
         });
         
+        // Підказки під час введення (з невеликою затримкою між натисканнями)
+        let suggestTimer = null;
+        let suggestController = null;
+        
+        document.getElementById('movie-name').addEventListener('input', function() {
+            clearTimeout(suggestTimer);
+            const query = this.value.trim();
+            if (query.length < 2) {
+                hideSuggestions();
+                return;
+            }
+            suggestTimer = setTimeout(() => loadSuggestions(query), 150);
+        });
+        
+        document.getElementById('movie-name').addEventListener('blur', hideSuggestions);
+        
+        function loadSuggestions(query) {
+            if (suggestController) suggestController.abort();
+            suggestController = new AbortController();
+            fetch(`/api/suggest?q=${encodeURIComponent(query)}`, { signal: suggestController.signal })
+                .then(response => response.json())
+                .then(data => renderSuggestions(data.suggestions || []))
+                .catch(() => {});
+        }
+        
+        function renderSuggestions(suggestions) {
+            const suggestionsDiv = document.getElementById('suggestions');
+            if (suggestions.length === 0) {
+                hideSuggestions();
+                return;
+            }
+            suggestionsDiv.innerHTML = suggestions
+                .map(suggestion => `<div class="suggestion">${suggestion.title}</div>`)
+                .join('');
+            suggestionsDiv.querySelectorAll('.suggestion').forEach((item, index) => {
+                // mousedown спрацьовує раніше за blur поля вводу
+                item.addEventListener('mousedown', () => selectSuggestion(suggestions[index]));
+            });
+            suggestionsDiv.style.display = 'block';
+        }
+        
+        function hideSuggestions() {
+            clearTimeout(suggestTimer);
+            document.getElementById('suggestions').style.display = 'none';
+        }
+        
+        function selectSuggestion(suggestion) {
+            // Відомий фільм показуємо одразу, без повного пошуку
+            document.getElementById('movie-name').value = suggestion.title;
+            hideSuggestions();
+            renderResults(suggestion.title, [suggestion]);
+        }
+        
+        function searchFor(query) {
+            document.getElementById('movie-name').value = query;
+            searchMovie();
+        }
+        
+        function renderDidYouMean(didYouMean) {
+            return didYouMean
+                ? `<p class="did-you-mean">Можливо, ви мали на увазі: <a href="#" onclick="searchFor('${didYouMean}'); return false;">${didYouMean}</a></p>`
+                : '';
+        }
+        
+        function renderResultCard(result, index) {
+            return `
+                <div class="result-card">
+                    <h3 class="result-title">${index + 1}. ${result.title || 'Без назви'}</h3>
+                    <p class="result-url"><a href="${result.url}" target="_blank">${result.url}</a></p>
+                    ${result.id ? `<p class="result-id">ID: ${result.id}</p>` : ''}
+                    ${result.is_direct_search ? '<p class="direct-search-note">Пряме посилання для пошуку</p>' : ''}
+                </div>
+            `;
+        }
+        
+        function renderResults(movie, results, didYouMean) {
+            const resultsDiv = document.getElementById('results');
+            if (results && results.length > 0) {
+                let html = `<h2 class="results-title">Результати пошуку для "${movie}":</h2>` + renderDidYouMean(didYouMean);
+                results.forEach((result, index) => {
+                    html += renderResultCard(result, index);
+                });
+                resultsDiv.innerHTML = html;
+            } else {
+                resultsDiv.innerHTML = `<div class="no-results">Нічого не знайдено для "${movie}"</div>` + renderDidYouMean(didYouMean);
+            }
+        }
+        
+        // Читає потокову відповідь NDJSON і викликає onEvent для кожного рядка
+        function readEventStream(response, onEvent) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            function read() {
+                return reader.read().then(({ done, value }) => {
+                    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                    const lines = buffer.split('\\n');
+                    buffer = done ? '' : lines.pop();
+                    lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+                    return done ? null : read();
+                });
+            }
+            return read();
+        }
+        
         function searchMovie() {
             const movieName = document.getElementById('movie-name').value.trim();
             if (!movieName) return;
+            hideSuggestions();
             
             const resultsDiv = document.getElementById('results');
             resultsDiv.innerHTML = '<div class="loading">Шукаємо фільми та серіали...</div>';
             
-            // Додаємо timestamp для запобігання кешуванню
-            const timestamp = new Date().getTime();
-            fetch(`/api/search?movie=${encodeURIComponent(movieName)}&_=${timestamp}`)
+            // Результати приходять потоком: кожну картку показуємо, щойно її джерело відповіло
+            let count = 0;
+            fetch(`/api/search?movie=${encodeURIComponent(movieName)}`, {
+                headers: { 'Accept': 'application/x-ndjson' }
+            })
                 .then(response => {
                     if (!response.ok) {
                         throw new Error(`HTTP error! Status: ${response.status}`);
                     }
-                    return response.json();
-                })
-                .then(data => {
-                    if (data.results && data.results.length > 0) {
-                        let html = `<h2 class="results-title">Результати пошуку для "${data.movie}":</h2>`;
-                        data.results.forEach((result, index) => {
-                            html += `
-                                <div class="result-card">
-                                    <h3 class="result-title">${index + 1}. ${result.title || 'Без назви'}</h3>
-                                    <p class="result-url"><a href="${result.url}" target="_blank">${result.url}</a></p>
-                                    ${result.id ? `<p class="result-id">ID: ${result.id}</p>` : ''}
-                                    ${result.is_direct_search ? '<p class="direct-search-note">Пряме посилання для пошуку</p>' : ''}
-                                </div>
-                            `;
-                        });
-                        resultsDiv.innerHTML = html;
-                    } else {
-                        resultsDiv.innerHTML = `<div class="no-results">Нічого не знайдено для "${data.movie}"</div>`;
-                    }
+                    return readEventStream(response, event => {
+                        if (event.type === 'result') {
+                            if (count === 0) {
+                                resultsDiv.innerHTML = `<h2 class="results-title">Результати пошуку для "${event.movie}":</h2>`;
+                            }
+                            resultsDiv.insertAdjacentHTML('beforeend', renderResultCard(event.result, count));
+                            count += 1;
+                        } else if (event.type === 'done') {
+                            if (count === 0) {
+                                renderResults(event.movie, [], event.did_you_mean);
+                            } else if (event.did_you_mean) {
+                                resultsDiv.querySelector('.results-title').insertAdjacentHTML('afterend', renderDidYouMean(event.did_you_mean));
+                            }
+                        }
+                    });
                 })
                 .catch(error => {
                     console.error('Error:', error);
@@ -306,45 +460,165 @@ HOME_TEMPLATE = """
 </html>
 """
 
+# Головна сторінка не змінюється: кодуємо і стискаємо її один раз
+home_page = StaticPage(HOME_TEMPLATE)
+
+def home_response():
+    encoding = home_page.negotiate(request.headers.get('Accept-Encoding'))
+    if etag_matches(request.headers.get('If-None-Match'), home_page.etags[encoding]):
+        return Response(status=304, headers=home_page.headers(encoding, include_body=False))
+    return Response(home_page.variants[encoding], headers=home_page.headers(encoding))
+
 @app.route('/api/search', methods=['GET'])
 def api_search():
     start_time = time.time()
+    # Усі запити до API в межах цього запиту користуються одним бюджетом часу
+    deadline = Deadline()
     movie_name = request.args.get('movie', '')
     if not movie_name:
         return jsonify({"error": "Не вказано назву фільму"}), 400
     
+    # Посторінковий режим, якщо вказано page або limit
+    pagination = None
+    if 'page' in request.args or 'limit' in request.args:
+        page = max(1, request.args.get('page', 1, type=int))
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), SEARCH_MAX_LIMIT))
+        pagination = (page, limit)
+    
+    # Деталі фільмів (постер, рейтинги, тривалість) для перших результатів
+    with_details = request.args.get('details') == '1'
+    
+    # Пошук одночасно через API і сторінку пошуку Кінопошуку (лише без пагінації)
+    multi_source = request.args.get('sources', 'all' if SEARCH_MULTI_SOURCE else 'api') == 'all'
+    
+    # Потоковий режим (NDJSON або Server-Sent Events) за заголовком Accept
+    stream_mimetype = negotiate_stream(request.headers.get('Accept'))
+    
+    # Потік починається до кінця пошуку, тож ETag і заголовки кешування є лише у звичайної JSON-відповіді
+    if stream_mimetype:
+        events = iter_search_events(movie_name, pagination, with_details, deadline, multi_source)
+        return Response(stream_search(stream_mimetype, start_time, events), headers=stream_headers(stream_mimetype))
+    
+    # Готова JSON-відповідь на такий самий нещодавній запит (без пошуку і серіалізації)
+    response_key = f"{pagination}:{with_details}:{multi_source}:{movie_name}"
+    cached_response = response_cache.get(response_key)
+    if cached_response is not None:
+        return serialized_response(cached_response)
+    
     # Шукаємо через API Кінопошуку
-    results = search_movie_kinopoisk_api(movie_name)
+    results, page_info = search_results(movie_name, pagination, with_details, deadline, multi_source)
+    did_you_mean = title_index.did_you_mean(movie_name)
+    
+    # Однакові результати - однаковий ETag, тож CDN і браузер можуть перевикористати відповідь
+    headers = search_cache_headers(
+        results, compute_etag(JSON_MIMETYPE, movie_name, results, page_info, did_you_mean),
+        deadline, page_info.get("sources")
+    )
+    if etag_matches(request.headers.get('If-None-Match'), headers["ETag"]):
+        return Response(status=304, headers=headers)
+    
+    # Додаємо час виконання запиту (у збереженій відповіді лишається час першого пошуку)
+    execution_time = time.time() - start_time
+    
+    cached_response = {
+        "body": serialize_json({
+            "movie": movie_name,
+            "results": results,
+            **page_info,
+            "did_you_mean": did_you_mean,
+            "execution_time": round(execution_time, 2)
+        }),
+        "headers": headers
+    }
+    response_cache.set(response_key, cached_response, ttl=search_response_ttl(results, deadline, page_info.get("sources")))
+    return serialized_response(cached_response)
+
+def serialized_response(cached_response):
+    # Стиснення виконує compress_json_response (стиснуті тіла кешуються за ETag)
+    headers = cached_response["headers"]
+    if etag_matches(request.headers.get('If-None-Match'), headers["ETag"]):
+        return Response(status=304, headers=headers)
+    return Response(cached_response["body"], headers=headers, mimetype=JSON_MIMETYPE)
+
+@app.route('/api/search/batch', methods=['POST'])
+def api_search_batch():
+    start_time = time.time()
+    deadline = Deadline()
+    data = request.get_json(silent=True) or {}
+    movie_names = data.get('movies')
+    if not isinstance(movie_names, list) or not movie_names or not all(isinstance(name, str) and name for name in movie_names):
+        return jsonify({"error": "Очікується JSON зі списком назв фільмів у полі movies"}), 400
+    if len(movie_names) > BATCH_MAX_TITLES:
+        return jsonify({"error": f"Забагато назв в одному запиті (максимум {BATCH_MAX_TITLES})"}), 400
+    
+    stream_mimetype = negotiate_stream(request.headers.get('Accept'))
+    if stream_mimetype:
+        return Response(stream_search_batch(movie_names, stream_mimetype, start_time, deadline),
+                        headers=stream_headers(stream_mimetype))
     
-    # Якщо результатів немає, створюємо пряме посилання
-    if not results:
-        direct_url = create_direct_search_url(movie_name)
-        results = [{
-            "title": f"Пошук для: {movie_name}",
-            "url": direct_url,
-            "id": None,
-            "is_direct_search": True
-        }]
+    # Шукаємо всі назви (однакові - один раз), результати в порядку запиту
+    batch_results = search_movies_batch(movie_names, deadline=deadline)
+    
+    items = []
+    for movie_name, results in zip(movie_names, batch_results):
+        items.append({
+            "movie": movie_name,
+            "results": results or [build_direct_search_result(movie_name)]
+        })
     
-    # Додаємо час виконання запиту
     execution_time = time.time() - start_time
     
     return jsonify({
-        "movie": movie_name,
-        "results": results,
+        "results": items,
         "execution_time": round(execution_time, 2)
     })
 
+def stream_search(mimetype, start_time, events):
+    # Кожна подія надсилається, щойно готова; остання містить час виконання
+    for event in events:
+        if event["type"] == "done":
+            event["execution_time"] = round(time.time() - start_time, 2)
+        yield format_stream_event(mimetype, event)
+
+def stream_search_batch(movie_names, mimetype, start_time, deadline=None):
+    yield format_stream_event(mimetype, {"type": "start", "count": len(movie_names)})
+    
+    # Результати йдуть у порядку готовності, index - позиція назви в запиті
+    for position, results in iter_search_movies_batch(movie_names, deadline=deadline):
+        movie_name = movie_names[position]
+        yield format_stream_event(mimetype, {
+            "type": "result",
+            "index": position,
+            "movie": movie_name,
+            "results": results or [build_direct_search_result(movie_name)]
+        })
+    
+    yield format_stream_event(mimetype, {
+        "type": "done",
+        "count": len(movie_names),
+        "execution_time": round(time.time() - start_time, 2)
+    })
+
+@app.route('/api/suggest', methods=['GET'])
+def api_suggest():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+    
+    # Підказки беремо лише з уже відомих назв, без запитів до API
+    return jsonify({
+        "query": query,
+        "suggestions": title_index.suggest(query, limit)
+    })
+
 @app.route('/search', methods=['GET'])
 def search():
-    movie_name = request.args.get('movie', '')
-    if movie_name:
-        return render_template_string(HOME_TEMPLATE)
-    return render_template_string(HOME_TEMPLATE)
+    # Пошук за параметром movie виконує сама сторінка
+    return home_response()
 
 @app.route('/', methods=['GET'])
 def home():
-    return render_template_string(HOME_TEMPLATE)
+    return home_response()
 
 @app.route('/api/info', methods=['GET'])
 def api_info():
@@ -357,9 +631,30 @@ def api_info():
                 "path": "/api/search",
                 "method": "GET",
                 "params": {
-                    "movie": "Назва фільму для пошуку"
+                    "movie": "Назва фільму для пошуку",
+                    "page": "Номер сторінки (необов'язково)",
+                    "limit": f"Кількість результатів на сторінці (до {SEARCH_MAX_LIMIT}, необов'язково)",
+                    "details": f"1 - додати постер, рейтинги і тривалість для перших {DETAILS_MAX_FILMS} результатів",
+                    "sources": "all - шукати одночасно через API і сторінку пошуку Кінопошуку (без page/limit)"
                 },
-                "description": "Пошук фільмів за назвою"
+                "description": "Пошук фільмів за назвою (Accept: application/x-ndjson або text/event-stream - потокова відповідь)"
+            },
+            {
+                "path": "/api/search/batch",
+                "method": "POST",
+                "params": {
+                    "movies": f"Список назв фільмів у тілі JSON (до {BATCH_MAX_TITLES})"
+                },
+                "description": "Пакетний пошук фільмів, результати в порядку запиту (у потоковому режимі - в порядку готовності)"
+            },
+            {
+                "path": "/api/suggest",
+                "method": "GET",
+                "params": {
+                    "q": "Початок назви фільму",
+                    "limit": f"Кількість підказок (до {SUGGEST_MAX_LIMIT})"
+                },
+                "description": "Підказки під час введення назви"
             },
             {
                 "path": "/health",
@@ -375,9 +670,37 @@ def health_check():
         "status": "ok",
         "timestamp": time.time(),
         "service": "SSPoisk API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "cache": search_cache.stats(),
+        "inflight": inflight_requests.stats(),
+        "refresh": cache_refresher.stats(),
+        "negative_cache": negative_cache.stats(),
+        "error_cache": error_cache.stats(),
+        "circuit_breaker": api_breaker.stats(),
+        "api_keys": api_key_pool.stats(),
+        "hedging": api_hedger.stats(),
+        "sources": multi_source_search.stats(),
+        "title_index": title_index.stats(),
+        "film_store": film_store.stats(),
+        "details_cache": details_cache.stats(),
+        "compressed_bodies": compressed_bodies.stats(),
+        "response_cache": response_cache.stats()
     })
 
+@app.after_request
+def compress_json_response(response):
+    # Стискаємо JSON-відповіді (потокові і вже стиснуті не чіпаємо)
+    if response.mimetype != JSON_MIMETYPE or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    body = response.get_data()
+    if len(body) >= COMPRESS_MIN_SIZE:
+        add_vary(response.headers, 'Accept-Encoding')
+    body, encoding = compress_response(body, request.headers.get('Accept-Encoding'), response.headers.get('ETag'))
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 # Обробник помилок для Serverless функцій
 @app.errorhandler(404)
 def not_found(e):
@@ -391,7 +714,7 @@ def server_error(e):
 @app.route('/<path:path>')
 def catch_all(path):
     # Перенаправляємо всі невідомі шляхи на головну сторінку
-    return render_template_string(HOME_TEMPLATE)
+    return home_response()
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
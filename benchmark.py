@@ -0,0 +1,309 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from cache import LRUCache, DiskCache
+from film_store import FilmStore
+from fuzzy_matcher import FuzzyMatcher
+from query_normalizer import query_cache_key
+
+def measure(fn, iterations, clock=time.perf_counter):
+    """
+    Вимірює середній час одного виклику функції
+
+    Args:
+        clock: Годинник (time.process_time - процесорний час)
+
+    Returns:
+        float: Середній час виклику в мікросекундах
+    """
+    start = clock()
+    for i in range(iterations):
+        fn(i)
+    return (clock() - start) / iterations * 1e6
+
+def sample_results(i):
+    return [{
+        "title": f"Фільм {i}-{j} (1999)",
+        "url": f"https://www.sspoisk.ru/film/{i * 10 + j}/",
+        "id": str(i * 10 + j),
+        "year": "1999",
+        "type": "film"
+    } for j in range(10)]
+
+def bench_cache_tiers(keys=1000, iterations=20000):
+    """
+    Час влучання в кеш у пам'яті та в дисковий кеш
+    """
+    memory = LRUCache(max_entries=keys)
+    path = os.path.join(tempfile.mkdtemp(), "bench_cache.sqlite3")
+    disk = DiskCache(path, max_entries=keys)
+
+    for i in range(keys):
+        memory.set(f"movie {i}", sample_results(i))
+        disk.set(f"movie {i}", sample_results(i))
+
+    memory_us = measure(lambda i: memory.get(f"movie {i % keys}"), iterations)
+    disk_us = measure(lambda i: disk.get(f"movie {i % keys}"), iterations // 10)
+
+    print("Влучання в кеш:")
+    print(f"  пам'ять: {memory_us:.2f} мкс")
+    print(f"  диск (SQLite): {disk_us:.2f} мкс")
+
+SAMPLE_TITLES = [
+    "Матрица", "Ёлки", "Интерстеллар", "Зелёная миля", "Брат 2", "Шрек",
+    "Spider-Man", "Побег из Шоушенка", "Иван Васильевич меняет профессию", "Дюна"
+]
+
+def _query_variants(title, rng):
+    variants = [
+        title,
+        title.lower(),
+        title.upper(),
+        f"  {title} ",
+        f"{title}!",
+        title.replace("е", "ё") if "ё" not in title else title.replace("ё", "е"),
+        title.replace("а", "a").replace("о", "o")
+    ]
+    return rng.choice(variants)
+
+def load_query_log(size=20000):
+    """
+    Повертає журнал запитів: з файлу QUERY_LOG (один запит на рядок)
+    або синтетичний журнал з різними написаннями популярних назв
+    """
+    path = os.environ.get("QUERY_LOG")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+
+    rng = random.Random(42)
+    titles = [f"{title} {part}" for title in SAMPLE_TITLES for part in range(1, 301)]
+    log = []
+    for i in range(size):
+        if rng.random() < 0.8:
+            log.append(_query_variants(rng.choice(titles), rng))
+        else:
+            log.append(f"unique query {i}")
+    return log
+
+def replay_hit_ratio(log, key_fn):
+    seen = set()
+    hits = 0
+    for query in log:
+        key = key_fn(query)
+        if key in seen:
+            hits += 1
+        seen.add(key)
+    return hits / len(log), len(seen)
+
+def bench_normalization():
+    """
+    Частка влучань у кеш на журналі запитів до і після нормалізації
+    """
+    log = load_query_log()
+    before, before_keys = replay_hit_ratio(log, lambda query: query.lower())
+    after, after_keys = replay_hit_ratio(log, query_cache_key)
+    per_query_us = measure(lambda i: query_cache_key(log[i % len(log)]), len(log))
+
+    print(f"Нормалізація запитів ({len(log)} запитів):")
+    print(f"  lower(): влучання {before:.1%}, ключів {before_keys}")
+    print(f"  normalize_query(): влучання {after:.1%}, ключів {after_keys}")
+    print(f"  час нормалізації: {per_query_us:.2f} мкс/запит")
+
+def bench_fuzzy(titles=100000, queries=2000):
+    """
+    Час виправлення опечатки на корпусі з titles синтетичних назв
+    """
+    rng = random.Random(7)
+    alphabet = "абвгдежзиклмнопрстуфхцчшщэюя"
+    words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(3, 11))) for _ in range(titles // 2)]
+
+    matcher = FuzzyMatcher()
+    start = time.perf_counter()
+    for _ in range(titles):
+        matcher.add_words(" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))))
+    build_seconds = time.perf_counter() - start
+
+    # Кожен запит - слово словника з однією заміненою літерою
+    typos = []
+    for _ in range(queries):
+        word = list(rng.choice(words))
+        word[rng.randrange(len(word))] = rng.choice(alphabet)
+        typos.append("".join(word))
+
+    per_query_us = measure(lambda i: matcher.correct(typos[i]), queries)
+    print(f"Виправлення опечаток ({titles} назв, {matcher.stats()['words']} слів):")
+    print(f"  побудова індексу: {build_seconds:.1f} с")
+    print(f"  запит з опечаткою: {per_query_us:.0f} мкс")
+    print(f"  запит без опечатки: {measure(lambda i: matcher.correct(words[i]), queries):.2f} мкс")
+
+def bench_home(iterations=2000):
+    """
+    Запитів/с до головної сторінки: рендеринг Jinja на кожен запит
+    проти заздалегідь закодованої і стиснутої сторінки
+    """
+    from flask import render_template_string
+    import api
+
+    # Так головна сторінка віддавалася раніше
+    api.app.add_url_rule("/bench/jinja", "bench_jinja", lambda: render_template_string(api.HOME_TEMPLATE))
+    client = api.app.test_client()
+
+    variants = [
+        ("Jinja на кожен запит", "/bench/jinja", {}),
+        ("готова сторінка, identity", "/", {}),
+        ("готова сторінка, gzip", "/", {"Accept-Encoding": "gzip"}),
+        ("готова сторінка, br", "/", {"Accept-Encoding": "br, gzip"}),
+        ("готова сторінка, 304", "/", {"If-None-Match": api.home_page.etags["identity"]})
+    ]
+    print(f"Головна сторінка ({len(api.home_page.variants['identity'])} байт):")
+    for name, path, headers in variants:
+        response = client.get(path, headers=headers)
+        per_request_us = measure(lambda i: client.get(path, headers=headers), iterations)
+        encoding = response.headers.get("Content-Encoding", "identity")
+        print(f"  {name}: {1e6 / per_request_us:.0f} запитів/с, "
+              f"{len(response.data)} байт ({encoding}, {response.status_code})")
+
+def bench_response_cache(queries=200, iterations=5000):
+    """
+    Процесорний час /api/search на влучання в кеш: побудова і серіалізація
+    відповіді на кожен запит проти готової відповіді з response_cache
+    """
+    import api
+    import movie_search
+    from http_utils import response_cache
+
+    titles = [f"Фільм {i}" for i in range(queries)]
+    for i, title in enumerate(titles):
+        movie_search.search_cache.set(query_cache_key(title), {
+            "results": sample_results(i),
+            "timestamp": time.time(),
+            "pages_count": 1
+        })
+
+    def hit(i, headers=None, keep_responses=True):
+        if not keep_responses:
+            response_cache.clear()
+        with api.app.test_request_context(f"/api/search?movie={titles[i % queries]}", headers=headers):
+            response = api.app.process_response(api.api_search())
+            response.get_data()
+
+    print(f"Влучання в кеш /api/search ({queries} запитів, 10 результатів у відповіді):")
+    for name, headers in (("JSON", None), ("gzip", {"Accept-Encoding": "gzip"})):
+        for i in range(queries):
+            hit(i, headers)
+        before_us = measure(lambda i: hit(i, headers, keep_responses=False), iterations, time.process_time)
+        after_us = measure(lambda i: hit(i, headers), iterations, time.process_time)
+        print(f"  {name}: побудова відповіді {before_us:.0f} мкс, готова відповідь {after_us:.0f} мкс процесорного часу")
+
+def replay_api_films(query):
+    """
+    Синтетична відповідь API на нормалізований запит: 20 фільмів "франшизи"
+    (запити "матрица 17" і "матрица 18" мають майже ті самі фільми)
+    """
+    words = query.split()
+    number = int(words[-1]) if words and words[-1].isdigit() else 0
+    family = abs(hash(" ".join(word for word in words if not word.isdigit()))) % 10000
+    return [{
+        "filmId": family * 1000 + (number + j) % 300,
+        "nameRu": f"Фільм {family}-{(number + j) % 300}",
+        "year": str(1990 + (number + j) % 30),
+        "type": "FILM" if j % 5 else "TV_SERIES"
+    } for j in range(20)]
+
+def bench_film_store():
+    """
+    Пам'ять на один закешований запит: повні dict результатів у кожному записі
+    проти списків ID і сховища фільмів
+    """
+    log = load_query_log()
+    keys = list(dict.fromkeys(query_cache_key(query) for query in log))
+    responses = {key: replay_api_films(key) for key in keys}
+
+    def full_results(items):
+        # Так результати зберігалися в кеші раніше
+        results = []
+        for item in items:
+            film_type = item["type"].lower()
+            path_type = "series" if film_type in ["tv_series", "mini_series", "tv_show"] else "film"
+            results.append({
+                "title": f"{item['nameRu']} ({item['year']})",
+                "url": f"https://www.kinopoisk.ru/{path_type}/{item['filmId']}/".replace("kinopoisk.ru", "sspoisk.ru"),
+                "id": str(item["filmId"]),
+                "year": str(item["year"]),
+                "type": film_type
+            })
+        return {"results": results, "timestamp": time.time()}
+
+    def film_ids(store, items):
+        films = [store.add(str(item["filmId"]), item["nameRu"], str(item["year"]), item["type"].lower()) for item in items]
+        return {"ids": [film.id for film in films], "pages_count": 1, "timestamp": time.time()}
+
+    print(f"Пам'ять кешу пошуку ({len(log)} запитів, {len(keys)} ключів, 20 фільмів у відповіді):")
+    for name, make_entry in (("повні результати", full_results), ("ID + сховище фільмів", film_ids)):
+        store = FilmStore()
+        tracemalloc.start()
+        cache = {}
+        for key in keys:
+            items = responses[key]
+            cache[key] = make_entry(items) if make_entry is full_results else make_entry(store, items)
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {name}: {used / len(keys):.0f} байт на запит ({used / 1024 / 1024:.1f} МБ, фільмів у сховищі: {len(store)})")
+
+def bench_hedging(calls=400, tail_rate=0.03, fast=0.02, slow=0.4):
+    """
+    Затримка запитів до повільного "хвоста" API з дубльованими запитами і без них
+    (tail_rate запитів відповідають за slow секунд замість fast)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from upstream import Hedger
+
+    def percentile(values, percent):
+        values = sorted(values)
+        return values[min(int(percent / 100 * len(values)), len(values) - 1)]
+
+    def run(hedger, rng):
+        def upstream_call():
+            time.sleep(slow if rng.random() < tail_rate else fast)
+            return "ok"
+
+        def one(_):
+            start = time.perf_counter()
+            hedger.call(upstream_call, lambda: upstream_call)
+            return time.perf_counter() - start
+
+        # Паралельні клієнти, як у serverless-екземплярі під навантаженням
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(one, range(calls)))
+
+    print(f"Дубльовані запити ({calls} запитів, {tail_rate:.0%} відповідають за {slow * 1000:.0f} мс):")
+    for name, hedger in (("без дублювання", Hedger(enabled=False)),
+                         ("дублювання p95, ліміт 5%", Hedger(enabled=True, percentile=95, max_rate=0.05)),
+                         ("дублювання p90, ліміт 10%", Hedger(enabled=True, percentile=90, max_rate=0.1))):
+        latencies = run(hedger, random.Random(3))
+        stats = hedger.stats()
+        print(f"  {name}: p50 {percentile(latencies, 50) * 1000:.0f} мс, p99 {percentile(latencies, 99) * 1000:.0f} мс, "
+              f"дубльовано {stats['hedged']} ({stats['hedged'] / calls:.1%}), друга спроба перемогла {stats['hedge_wins']}")
+
+BENCHMARKS = {
+    "cache": bench_cache_tiers,
+    "normalize": bench_normalization,
+    "fuzzy": bench_fuzzy,
+    "home": bench_home,
+    "responses": bench_response_cache,
+    "films": bench_film_store,
+    "hedging": bench_hedging
+}
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,677 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Стандартне розташування дискового кешу (на Vercel доступний для запису лише /tmp)
+DEFAULT_DISK_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'sspoisk_search_cache.sqlite3')
+
+
+def _write_snapshot(path, entries, encode=None):
+    # Спершу пишемо у тимчасовий файл, щоб не лишити напівзаписаний знімок
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for key, value, expires_at in entries:
+            if encode is not None:
+                value = encode(value)
+                if value is None:
+                    continue
+            f.write(json.dumps({"key": key, "value": value, "expires_at": expires_at}, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def _read_snapshot(path, decode=None):
+    now = time.time()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record["expires_at"] <= now:
+                continue
+            value = decode(record["value"]) if decode is not None else record["value"]
+            if value is not None:
+                yield record["key"], value, record["expires_at"]
+
+
+def estimate_size(value):
+    """
+    Приблизно оцінює розмір значення в пам'яті (в байтах)
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class LRUCache:
+    """
+    Обмежений потокобезпечний кеш з витісненням LRU та терміном життя записів
+
+    Args:
+        max_entries (int): Максимальна кількість записів (None - без обмеження)
+        max_bytes (int): Бюджет пам'яті в байтах (None - без обмеження)
+        ttl (float): Час життя запису в секундах
+        sweep_interval (float): Як часто активно видаляти прострочені записи
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=3600, sweep_interval=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+
+        # key -> (value, expires_at, size); порядок - від найстарішого використання
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._next_sweep = time.time() + sweep_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[1] <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_entry(self, key):
+        """
+        Повертає (значення, час закінчення) або None, не змінюючи лічильники
+        """
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0], entry[1]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        size = estimate_size(value)
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+            # Запис, що не влазить у бюджет, не кешуємо взагалі
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+
+            if now >= self._next_sweep:
+                self._purge_expired(now)
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def purge_expired(self):
+        """
+        Видаляє всі прострочені записи
+
+        Returns:
+            int: Кількість видалених записів
+        """
+        with self._lock:
+            return self._purge_expired(time.time())
+
+    def export_snapshot(self, path, encode=None):
+        """
+        Зберігає актуальні записи у файл (JSON Lines)
+
+        Args:
+            encode (callable): Перетворює значення перед записом (None - пропустити запис)
+
+        Returns:
+            int: Кількість збережених записів
+        """
+        now = time.time()
+        with self._lock:
+            entries = [(key, entry[0], entry[1]) for key, entry in self._data.items() if entry[1] > now]
+        return _write_snapshot(path, entries, encode)
+
+    def import_snapshot(self, path, decode=None):
+        """
+        Завантажує записи зі знімка, створеного export_snapshot
+
+        Args:
+            decode (callable): Перетворює прочитане значення (None - пропустити запис)
+
+        Returns:
+            int: Кількість завантажених записів
+        """
+        count = 0
+        now = time.time()
+        for key, value, expires_at in _read_snapshot(path, decode):
+            self.set(key, value, ttl=expires_at - now)
+            count += 1
+        return count
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > time.time()
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _purge_expired(self, now):
+        expired = [key for key, entry in self._data.items() if entry[1] <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        self._next_sweep = now + self.sweep_interval
+        return len(expired)
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+
+class DiskCache:
+    """
+    Дисковий кеш на SQLite, який переживає перезапуск процесу (холодний старт)
+
+    Args:
+        path (str): Шлях до файлу бази даних
+        ttl (float): Час життя запису в секундах
+        max_entries (int): Максимальна кількість записів (None - без обмеження)
+        max_bytes (int): Максимальний сумарний розмір значень (None - без обмеження)
+        compact_every (int): Через скільки записів запускати ущільнення
+    """
+
+    def __init__(self, path=DEFAULT_DISK_CACHE_PATH, ttl=3600, max_entries=10000,
+                 max_bytes=64 * 1024 * 1024, compact_every=100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """
+        Повертає (значення, час закінчення) або None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, expires_at, now, size)
+            )
+            self._writes += 1
+            if self._writes >= self.compact_every:
+                self._compact(now)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("VACUUM")
+
+    def compact(self):
+        """
+        Видаляє прострочені записи, витісняє найдавніше використані
+        понад ліміти і звільняє місце у файлі
+        """
+        with self._lock:
+            self._compact(time.time(), vacuum=True)
+
+    def export_snapshot(self, path, encode=None):
+        """
+        Зберігає актуальні записи у файл (JSON Lines)
+
+        Args:
+            encode (callable): Перетворює значення перед записом (None - пропустити запис)
+
+        Returns:
+            int: Кількість збережених записів
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM entries WHERE expires_at > ?", (time.time(),)
+            ).fetchall()
+        return _write_snapshot(path, ((key, json.loads(value), expires_at) for key, value, expires_at in rows), encode)
+
+    def import_snapshot(self, path, decode=None):
+        """
+        Завантажує записи зі знімка, створеного export_snapshot
+
+        Args:
+            decode (callable): Перетворює прочитане значення (None - пропустити запис)
+
+        Returns:
+            int: Кількість завантажених записів
+        """
+        count = 0
+        now = time.time()
+        for key, value, expires_at in _read_snapshot(path, decode):
+            self.set(key, value, ttl=expires_at - now)
+            count += 1
+        return count
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": total,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _compact(self, now, vacuum=False):
+        self._writes = 0
+        self.expirations += self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+
+        if self.max_entries is not None:
+            self.evictions += self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                # Витісняємо найдавніше використані записи, поки не вмістимося в бюджет
+                excess = total - self.max_bytes
+                keys = []
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                    keys.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+                self.evictions += len(keys)
+
+        if vacuum:
+            self._conn.execute("VACUUM")
+
+
+class TieredCache:
+    """
+    Дворівневий кеш: швидкий кеш у пам'яті перед повільнішим дисковим
+
+    Записи пишуться в обидва рівні, а влучання на диску піднімаються в пам'ять
+    із тим самим часом закінчення
+    """
+
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        self.memory.set(key, value, ttl=expires_at - time.time())
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl=ttl)
+        self.disk.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def export_snapshot(self, path, encode=None):
+        # Дисковий рівень містить усе, що є в пам'яті
+        return self.disk.export_snapshot(path, encode)
+
+    def import_snapshot(self, path, decode=None):
+        return self.disk.import_snapshot(path, decode)
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats()
+        }
+
+
+class BloomFilter:
+    """
+    Компактна ймовірнісна множина: можливі хибнопозитивні відповіді,
+    але не хибнонегативні
+
+    Args:
+        capacity (int): Очікувана кількість елементів
+        error_rate (float): Допустима частка хибнопозитивних відповідей
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Подвійне хешування: k позицій з двох 64-бітних хешів
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def size_bytes(self):
+        return len(self._bits)
+
+
+class NegativeCache:
+    """
+    Кеш "негативних" відповідей (порожні результати, помилки) з коротким терміном життя
+
+    Зберігає лише факт наявності ключа у двох поколіннях фільтрів Блума,
+    тому мільйони ключів займають фіксований обсяг пам'яті. Покоління
+    змінюються кожні ttl / 2 секунд (або при переповненні), тому ключ
+    живе не довше ttl.
+
+    Args:
+        ttl (float): Час життя запису в секундах
+        capacity (int): Кількість ключів в одному поколінні
+        error_rate (float): Допустима частка хибнопозитивних відповідей
+    """
+
+    def __init__(self, ttl=600, capacity=100000, error_rate=0.001):
+        self.ttl = ttl
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._rotate_at = time.time() + ttl / 2
+
+        self.hits = 0
+        self.misses = 0
+        self.rotations = 0
+
+    def _maybe_rotate(self, now):
+        if now >= self._rotate_at or len(self._current) >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotate_at = now + self.ttl / 2
+            self.rotations += 1
+
+    def add(self, key):
+        with self._lock:
+            self._maybe_rotate(time.time())
+            self._current.add(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._maybe_rotate(time.time())
+            found = key in self._current or key in self._previous
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def clear(self):
+        with self._lock:
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._previous = BloomFilter(self.capacity, self.error_rate)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "entries": len(self._current) + len(self._previous),
+                "bytes": self._current.size_bytes + self._previous.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rotations": self.rotations
+            }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Об'єднує одночасні однакові виклики: для кожного ключа виконується лише
+    один виклик, а всі інші чекають і отримують його результат (або помилку)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Виконує fn для ключа або чекає на результат виклику, що вже виконується
+
+        Args:
+            timeout (float): Скільки чекати на чужий виклик (None - без обмеження)
+
+        Raises:
+            TimeoutError: Якщо чужий виклик не завершився за timeout
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(f"Виклик {key!r} не завершився за {timeout:.2f} с")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "calls": self.calls,
+                "shared": self.shared
+            }
+
+
+class BackgroundRefresher:
+    """
+    Оновлює записи кешу у фоні: для кожного ключа одночасно виконується
+    не більше одного оновлення
+
+    Args:
+        max_workers (int): Максимальна кількість фонових потоків
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cache-refresh")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.scheduled = 0
+        self.failed = 0
+
+    def schedule(self, key, fn):
+        """
+        Запускає fn у фоні, якщо оновлення цього ключа ще не виконується
+
+        Returns:
+            bool: True, якщо оновлення заплановано
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            self.scheduled += 1
+        self._executor.submit(self._run, key, fn)
+        return True
+
+    def _run(self, key, fn):
+        try:
+            fn()
+        except Exception as e:
+            self.failed += 1
+            print(f"Помилка фонового оновлення кешу для '{key}': {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "scheduled": self.scheduled,
+                "failed": self.failed
+            }
@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Налаштування сховища фільмів
+FILM_STORE_MAX_FILMS = int(os.environ.get('FILM_STORE_MAX_FILMS', '200000'))
+SERIES_TYPES = ("tv_series", "mini_series", "tv_show")
+
+def _intern(value):
+    # Рік і тип повторюються в тисячах записів - зберігаємо один екземпляр рядка
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class FilmRecord:
+    """
+    Компактний запис фільму; dict результату будується лише для відповіді
+    """
+    __slots__ = ("id", "name", "year", "type")
+
+    def __init__(self, film_id, name, year, film_type):
+        self.id = film_id
+        self.name = name
+        self.year = _intern(year)
+        self.type = _intern(film_type)
+
+    def as_result(self):
+        # Серіали на sspoisk.ru мають інший шлях, ніж фільми
+        path_type = "series" if self.type in SERIES_TYPES else "film"
+        return {
+            "title": f"{self.name} ({self.year})" if self.year else self.name,
+            "url": f"https://www.sspoisk.ru/{path_type}/{self.id}/",
+            "id": self.id,
+            "year": self.year,
+            "type": self.type
+        }
+
+    def as_tuple(self):
+        return [self.name, self.year, self.type]
+
+
+class FilmStore:
+    """
+    Сховище фільмів за ID: кожен фільм зберігається один раз
+
+    Записи кешу пошуку тримають лише списки ID (ті самі об'єкти рядків,
+    що й записи сховища), а результати будуються з записів під час відповіді.
+    Необов'язковий дисковий рівень (DiskCache) зберігає фільми між холодними
+    стартами разом з дисковим кешем пошуку.
+
+    Args:
+        max_films (int): Максимальна кількість фільмів (давно не використані витісняються)
+        disk (DiskCache): Дисковий рівень або None
+    """
+
+    def __init__(self, max_films=FILM_STORE_MAX_FILMS, disk=None):
+        self.max_films = max_films
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._films = OrderedDict()  # film_id -> FilmRecord
+
+        self.evictions = 0
+
+    def add(self, film_id, name, year, film_type):
+        """
+        Додає або оновлює фільм
+
+        Returns:
+            FilmRecord: Запис фільму (той самий об'єкт, якщо фільм не змінився)
+        """
+        with self._lock:
+            record = self._films.get(film_id)
+            if record is not None and (record.name, record.year, record.type) == (name, year, film_type):
+                self._films.move_to_end(film_id)
+                return record
+            record = FilmRecord(record.id if record is not None else film_id, name, year, film_type)
+            self._put(film_id, record)
+
+        if self.disk is not None:
+            self.disk.set(film_id, record.as_tuple())
+        return record
+
+    def get(self, film_id):
+        with self._lock:
+            record = self._films.get(film_id)
+            if record is not None:
+                self._films.move_to_end(film_id)
+                return record
+        if self.disk is None:
+            return None
+
+        stored = self.disk.get(film_id)
+        if stored is None:
+            return None
+        with self._lock:
+            # Піднімаємо фільм з диска в пам'ять
+            record = self._films.get(film_id)
+            if record is None:
+                record = FilmRecord(film_id, *stored)
+                self._put(film_id, record)
+            return record
+
+    def _put(self, film_id, record):
+        self._films[film_id] = record
+        self._films.move_to_end(film_id)
+        while len(self._films) > self.max_films:
+            self._films.popitem(last=False)
+            self.evictions += 1
+
+    def results(self, film_ids):
+        """
+        Будує результати пошуку за списком ID
+
+        Returns:
+            list: Результати або None, якщо якогось фільму вже немає в сховищі
+        """
+        results = []
+        for film_id in film_ids:
+            record = self.get(film_id)
+            if record is None:
+                return None
+            results.append(record.as_result())
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "films": len(self._films),
+                "max_films": self.max_films,
+                "evictions": self.evictions,
+                "disk": self.disk is not None
+            }
+
+    def __len__(self):
+        return len(self._films)
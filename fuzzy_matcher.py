@@ -0,0 +1,159 @@
+import os
+import threading
+
+# Налаштування виправлення опечаток
+FUZZY_MAX_DISTANCE = int(os.environ.get('FUZZY_MAX_DISTANCE', '2'))
+FUZZY_PREFIX_LENGTH = int(os.environ.get('FUZZY_PREFIX_LENGTH', '6'))
+FUZZY_MIN_WORD_LENGTH = 3  # коротші слова не виправляємо
+
+def edit_distance(a, b, max_distance):
+    """
+    Відстань Дамерау-Левенштейна (з перестановкою сусідніх літер)
+
+    Returns:
+        int: Відстань або max_distance + 1, якщо вона більша за max_distance
+    """
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len_b + 1))
+    for i in range(1, len_a + 1):
+        char_a = a[i - 1]
+        current = [i] * (len_b + 1)
+        row_min = i
+        for j in range(1, len_b + 1):
+            char_b = b[j - 1]
+            value = previous[j - 1] if char_a == char_b else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (previous_previous is not None and j > 1 and char_a == b[j - 2]
+                    and a[i - 2] == char_b and previous_previous[j - 2] + 1 < value):
+                value = previous_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+def _deletes(word, max_distance):
+    # Усі варіанти слова з видаленими 1..max_distance літерами
+    result = set()
+    level = {word}
+    for _ in range(max_distance):
+        level = {item[:i] + item[i + 1:] for item in level for i in range(len(item))}
+        result |= level
+    return result
+
+
+class FuzzyMatcher:
+    """
+    Виправлення опечаток за словником слів з відомих назв (індекс видалень у стилі SymSpell)
+
+    Для кожного слова словника заздалегідь зберігаються всі варіанти його
+    префікса з видаленими літерами, тож пошук кандидатів для слова запиту -
+    це кілька звернень до словника замість перебору всіх слів.
+
+    Args:
+        max_distance (int): Максимальна відстань редагування
+        prefix_length (int): Довжина префікса слова, для якого будуються видалення
+    """
+
+    def __init__(self, max_distance=FUZZY_MAX_DISTANCE, prefix_length=FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._lock = threading.Lock()
+        self._words = {}  # слово -> частота
+        self._deletes = {}  # варіант з видаленими літерами -> множина слів
+
+        self.corrections = 0
+
+    def _word_distance(self, word):
+        # Короткі слова виправляємо обережніше
+        return 1 if len(word) <= 4 else self.max_distance
+
+    def _keys(self, word):
+        prefix = word[:self.prefix_length]
+        return _deletes(prefix, self._word_distance(word)) | {prefix}
+
+    def add_words(self, text):
+        with self._lock:
+            for word in text.split():
+                if len(word) < FUZZY_MIN_WORD_LENGTH or word.isdigit():
+                    continue
+                count = self._words.get(word, 0)
+                self._words[word] = count + 1
+                if count == 0:
+                    for key in self._keys(word):
+                        self._deletes.setdefault(key, set()).add(word)
+
+    def remove_words(self, text):
+        with self._lock:
+            for word in text.split():
+                count = self._words.get(word)
+                if count is None:
+                    continue
+                if count > 1:
+                    self._words[word] = count - 1
+                    continue
+                del self._words[word]
+                for key in self._keys(word):
+                    words = self._deletes.get(key)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._deletes[key]
+
+    def correct_word(self, word):
+        """
+        Повертає найближче слово словника (або саме слово, якщо виправлення немає)
+        """
+        if len(word) < FUZZY_MIN_WORD_LENGTH or word.isdigit():
+            return word
+        with self._lock:
+            if word in self._words:
+                return word
+            max_distance = self._word_distance(word)
+            candidates = set()
+            for key in self._keys(word):
+                candidates |= self._deletes.get(key, set())
+
+            best = None
+            for candidate in candidates:
+                if abs(len(candidate) - len(word)) > max_distance:
+                    continue
+                distance = edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                rank = (distance, -self._words[candidate])
+                if best is None or rank < best[0]:
+                    best = (rank, candidate)
+                    # Далі цікаві лише кандидати не далші за знайденого
+                    max_distance = distance
+        return best[1] if best else word
+
+    def correct(self, query):
+        """
+        Виправляє кожне слово нормалізованого запиту
+
+        Returns:
+            str: Виправлений запит (той самий рядок, якщо виправлень немає)
+        """
+        corrected = " ".join(self.correct_word(word) for word in query.split())
+        if corrected != query:
+            with self._lock:
+                self.corrections += 1
+            return corrected
+        return query
+
+    def stats(self):
+        with self._lock:
+            return {
+                "words": len(self._words),
+                "deletes": len(self._deletes),
+                "corrections": self.corrections
+            }
@@ -0,0 +1,295 @@
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from cache import LRUCache
+
+# Brotli необов'язковий: без нього сторінка віддається в gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Типи потокових відповідей, які клієнт може вибрати заголовком Accept
+NDJSON_MIMETYPE = "application/x-ndjson"
+SSE_MIMETYPE = "text/event-stream"
+JSON_MIMETYPE = "application/json"
+
+# Скільки секунд браузер може не перевіряти відповідь (CDN керується s-maxage)
+BROWSER_MAX_AGE = int(os.environ.get('BROWSER_MAX_AGE', '60'))
+
+# Кешування статичних сторінок (кеш CDN скидається під час кожного деплою)
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', '3600'))
+STATIC_S_MAXAGE = int(os.environ.get('STATIC_S_MAXAGE', '604800'))
+
+# Порядок переваги кодувань, коли клієнт приймає кілька
+PREFERRED_ENCODINGS = ("br", "gzip", "identity")
+
+# Стиснення JSON-відповідей: менші за поріг відповіді не стискаються
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+COMPRESS_ENCODINGS = ("gzip", "deflate")
+
+# Стиснуті тіла відповідей з ETag (ключ - ETag і кодування), щоб не стискати гарячі запити повторно
+COMPRESS_CACHE_TTL = int(os.environ.get('COMPRESS_CACHE_TTL', '86400'))
+COMPRESS_CACHE_MAX_BYTES = int(os.environ.get('COMPRESS_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+compressed_bodies = LRUCache(max_entries=4096, max_bytes=COMPRESS_CACHE_MAX_BYTES, ttl=COMPRESS_CACHE_TTL)
+
+# Готові (серіалізовані) відповіді на пошук: влучання - це пошук у словнику і запис у сокет.
+# Термін життя короткий, бо поки відповідь у цьому кеші, пошук (і фонове оновлення) не виконується
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+response_cache = LRUCache(max_entries=4096, max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL)
+
+def negotiate_stream(accept_header):
+    """
+    Визначає потоковий формат відповіді за заголовком Accept
+
+    Returns:
+        str: NDJSON_MIMETYPE, SSE_MIMETYPE або None для звичайного JSON
+    """
+    if not accept_header:
+        return None
+    for part in accept_header.split(","):
+        mimetype = part.split(";")[0].strip().lower()
+        if mimetype in (NDJSON_MIMETYPE, SSE_MIMETYPE):
+            return mimetype
+    return None
+
+def stream_headers(mimetype):
+    """
+    Заголовки потокової відповіді (без буферизації на проксі)
+    """
+    return {
+        "Content-Type": f"{mimetype}; charset=utf-8",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }
+
+def format_stream_event(mimetype, event):
+    """
+    Кодує одну подію потоку: рядок NDJSON або подію Server-Sent Events
+
+    Args:
+        mimetype (str): NDJSON_MIMETYPE або SSE_MIMETYPE
+        event (dict): Подія з полем type
+
+    Returns:
+        bytes: Закодована подія
+    """
+    data = json.dumps(event, ensure_ascii=False)
+    if mimetype == SSE_MIMETYPE:
+        return f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+    return f"{data}\n".encode("utf-8")
+
+def compute_etag(*parts):
+    """
+    Слабкий ETag за вмістом відповіді
+    
+    Поля, що змінюються з кожним запитом (час виконання), в ETag не входять,
+    тому тіло відповіді може відрізнятися побайтово - звідси слабкий ETag.
+    
+    Args:
+        *parts: Дані, від яких залежить відповідь (формат, результати...)
+    
+    Returns:
+        str: ETag у форматі W/"..."
+    """
+    content = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return f'W/"{hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]}"'
+
+def etag_matches(if_none_match, etag):
+    """
+    Перевіряє заголовок If-None-Match (слабке порівняння, як вимагає RFC 9110)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
+
+def cache_headers(etag, s_maxage, stale_while_revalidate):
+    """
+    Заголовки кешування для браузера і CDN
+    
+    Args:
+        etag (str): ETag відповіді
+        s_maxage (int): Скільки секунд відповідь свіжа в CDN
+        stale_while_revalidate (int): Скільки секунд після цього CDN може віддавати
+            застарілу відповідь, оновлюючи її у фоні
+    """
+    return {
+        "ETag": etag,
+        "Cache-Control": (f"public, max-age={min(BROWSER_MAX_AGE, s_maxage)}, s-maxage={s_maxage}, "
+                          f"stale-while-revalidate={stale_while_revalidate}"),
+        # JSON і потокові відповіді на одну адресу кешуються окремо
+        "Vary": "Accept"
+    }
+
+def parse_accept_encoding(accept_encoding):
+    """
+    Розбирає заголовок Accept-Encoding
+
+    Returns:
+        dict: Кодування -> вага q (кодування з q=0 заборонені)
+    """
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def negotiate_compression(accept_encoding):
+    """
+    Вибирає кодування для динамічної відповіді (gzip або deflate)
+
+    Returns:
+        str: Кодування або None, якщо клієнт не приймає стиснення
+    """
+    weights = parse_accept_encoding(accept_encoding)
+    default_weight = weights.get("*", 0.0)
+    best = None
+    best_weight = 0.0
+    for encoding in COMPRESS_ENCODINGS:
+        weight = weights.get(encoding, default_weight)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+def compress_body(body, encoding):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    # deflate в HTTP - це потік zlib
+    return zlib.compress(body, COMPRESS_LEVEL)
+
+def compress_response(body, accept_encoding, etag=None):
+    """
+    Стискає тіло відповіді, якщо клієнт це приймає і тіло не менше за поріг
+
+    Тіла відповідей з ETag кешуються стиснутими: однаковий ETag означає
+    однаковий вміст, тож гарячі запити не стискаються повторно.
+
+    Args:
+        body (bytes): Тіло відповіді
+        accept_encoding (str): Заголовок Accept-Encoding запиту
+        etag (str): ETag відповіді (None - не кешувати)
+
+    Returns:
+        tuple: (тіло, кодування або None, якщо тіло не стиснуте)
+    """
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    encoding = negotiate_compression(accept_encoding)
+    if encoding is None:
+        return body, None
+    if etag is None:
+        return compress_body(body, encoding), encoding
+
+    key = f"{etag}:{encoding}"
+    compressed = compressed_bodies.get(key)
+    if compressed is None:
+        compressed = compress_body(body, encoding)
+        compressed_bodies.set(key, compressed)
+    return compressed, encoding
+
+def serialize_json(data):
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+def encode_response(body, headers, accept_encoding):
+    """
+    Готує тіло і заголовки JSON-відповіді до відправлення (зі стисненням, якщо можна)
+
+    Returns:
+        tuple: (тіло, заголовки)
+    """
+    headers = dict(headers)
+    if len(body) >= COMPRESS_MIN_SIZE:
+        add_vary(headers, "Accept-Encoding")
+    body, encoding = compress_response(body, accept_encoding, headers.get("ETag"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, headers
+
+def add_vary(headers, value):
+    # Додає значення до заголовка Vary, не дублюючи його
+    current = headers.get("Vary")
+    if not current:
+        headers["Vary"] = value
+    elif value.lower() not in (part.strip().lower() for part in current.split(",")):
+        headers["Vary"] = f"{current}, {value}"
+
+class StaticPage:
+    """
+    Статична сторінка, закодована і стиснута один раз під час імпорту
+
+    Для кожного кодування (identity, gzip і br, якщо доступний brotli)
+    зберігаються готові байти і власний сильний ETag, тож обробка запиту -
+    це лише вибір варіанту за Accept-Encoding.
+
+    Args:
+        text (str): Вміст сторінки
+        content_type (str): Значення заголовка Content-Type
+    """
+
+    def __init__(self, text, content_type="text/html; charset=utf-8"):
+        self.content_type = content_type
+        body = text.encode("utf-8")
+        self.variants = {"identity": body}
+
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = data
+
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def negotiate(self, accept_encoding):
+        """
+        Вибирає найкраще доступне кодування для заголовка Accept-Encoding
+        """
+        weights = parse_accept_encoding(accept_encoding)
+        default_weight = weights.get("*", 0.0)
+        best = "identity"
+        best_weight = 0.0
+        for encoding in PREFERRED_ENCODINGS:
+            if encoding not in self.variants or encoding == "identity":
+                continue
+            weight = weights.get(encoding, default_weight)
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
+
+    def headers(self, encoding, include_body=True):
+        """
+        Заголовки відповіді для вибраного кодування (для 304 - без заголовків тіла)
+        """
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": f"public, max-age={STATIC_MAX_AGE}, s-maxage={STATIC_S_MAXAGE}",
+            "Vary": "Accept-Encoding"
+        }
+        if include_body:
+            headers["Content-Type"] = self.content_type
+            headers["Content-Length"] = str(len(self.variants[encoding]))
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+        return headers
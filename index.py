@@ -1,92 +1,20 @@
 import json
 import urllib.parse
-import requests
-import os
 import time
-import re
 from http.server import BaseHTTPRequestHandler
-
-# Перевіряємо, чи встановлено змінну середовища для API ключа
-KINOPOISK_API_KEY = os.environ.get('KINOPOISK_API_KEY', '6ca43889-42a5-4ef4-8de7-ab98315826d3')
-
-# Кеш для результатів пошуку
-search_cache = {}
-CACHE_EXPIRY = 3600  # 1 година в секундах
-
-def search_movie_kinopoisk_api(movie_name):
-    """
-    Шукає фільм через неофіційний API Кінопошуку
-    """
-    # Перевіряємо кеш
-    cache_key = movie_name.lower()
-    current_time = time.time()
-    
-    if cache_key in search_cache:
-        cache_entry = search_cache[cache_key]
-        if current_time - cache_entry['timestamp'] < CACHE_EXPIRY:
-            return cache_entry['results']
-    
-    try:
-        # Кодуємо назву фільму для URL
-        encoded_query = urllib.parse.quote(movie_name)
-        
-        # Використовуємо неофіційний API Кінопошуку
-        search_url = f"https://kinopoiskapiunofficial.tech/api/v2.1/films/search-by-keyword?keyword={encoded_query}"
-        
-        # Заголовки для API
-        headers = {
-            "X-API-KEY": KINOPOISK_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        
-        for item in data.get("films", []):
-            film_id = item.get("filmId")
-            title = item.get("nameRu") or item.get("nameEn") or "Невідома назва"
-            year = item.get("year", "")
-            film_type = item.get("type", "").lower()
-            
-            # Визначаємо тип (фільм чи серіал)
-            path_type = "film"
-            if film_type in ["tv_series", "mini_series", "tv_show"]:
-                path_type = "series"
-            
-            # Формуємо посилання на Кінопошук
-            kinopoisk_url = f"https://www.kinopoisk.ru/{path_type}/{film_id}/"
-            # Замінюємо на sspoisk.ru
-            sspoisk_url = kinopoisk_url.replace("kinopoisk.ru", "sspoisk.ru")
-            
-            results.append({
-                "title": f"{title} ({year})" if year else title,
-                "url": sspoisk_url,
-                "id": str(film_id),
-                "year": year,
-                "type": film_type
-            })
-        
-        # Зберігаємо результати в кеш
-        search_cache[cache_key] = {
-            'results': results,
-            'timestamp': current_time
-        }
-        
-        return results
-    
-    except Exception as e:
-        print(f"Помилка при виконанні запиту до API Кінопошуку: {e}")
-        return []
-
-def create_direct_search_url(movie_name):
-    """
-    Створює пряме посилання для пошуку на sspoisk.ru
-    """
-    encoded_query = urllib.parse.quote(movie_name)
-    return f"https://sspoisk.ru/index.php?kp_query={encoded_query}"
+from movie_search import (
+    search_movies_batch, iter_search_movies_batch, DETAILS_MAX_FILMS, multi_source_search, SEARCH_MULTI_SOURCE,
+    build_direct_search_result, BATCH_MAX_TITLES, SEARCH_PAGE_SIZE, SEARCH_MAX_LIMIT,
+    search_cache, inflight_requests, cache_refresher, negative_cache, error_cache,
+    title_index, film_store, details_cache
+)
+from title_index import SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
+from http_utils import (
+    negotiate_stream, stream_headers, format_stream_event, compute_etag, etag_matches, JSON_MIMETYPE,
+    StaticPage, compressed_bodies, serialize_json, encode_response, response_cache
+)
+from upstream import api_breaker, api_key_pool, api_hedger, Deadline
+from search_response import search_results, search_cache_headers, search_response_ttl, iter_search_events
 
 # HTML шаблон для головної сторінки
 HOME_TEMPLATE = """
@@ -186,6 +114,32 @@ HOME_TEMPLATE = """
             background-color: #2980b9;
         }
         
+        .search-box {
+            position: relative;
+        }
+        
+        .suggestions {
+            display: none;
+            position: absolute;
+            top: 100%;
+            left: 0;
+            right: 0;
+            z-index: 10;
+            background-color: var(--card-bg);
+            border: 1px solid #ddd;
+            border-radius: 0 0 4px 4px;
+            box-shadow: 0 4px 10px rgba(0,0,0,0.1);
+        }
+        
+        .suggestion {
+            padding: 8px 15px;
+            cursor: pointer;
+        }
+        
+        .suggestion:hover {
+            background-color: var(--light-bg);
+        }
+        
         .results-container {
             margin-top: 2rem;
         }
@@ -239,6 +193,15 @@ HOME_TEMPLATE = """
             margin-bottom: 0;
         }
         
+        .did-you-mean {
+            margin-bottom: 1rem;
+            color: #666;
+        }
+        
+        .did-you-mean a {
+            color: var(--secondary-color);
+        }
+        
         .direct-search-note {
             font-style: italic;
             color: var(--accent-color);
@@ -313,6 +276,7 @@ HOME_TEMPLATE = """
             <div class="search-box">
                 <input type="text" id="movie-name" class="search-input" placeholder="Введіть назву фільму або серіалу..." autofocus>
                 <button onclick="searchMovie()" class="search-button">Пошук</button>
+                <div id="suggestions" class="suggestions"></div>
             </div>
         </div>
         
@@ -334,39 +298,144 @@ HOME_TEMPLATE = """
             }
         });
         
+        // Підказки під час введення (з невеликою затримкою між натисканнями)
+        let suggestTimer = null;
+        let suggestController = null;
+        
+        document.getElementById('movie-name').addEventListener('input', function() {
+            clearTimeout(suggestTimer);
+            const query = this.value.trim();
+            if (query.length < 2) {
+                hideSuggestions();
+                return;
+            }
+            suggestTimer = setTimeout(() => loadSuggestions(query), 150);
+        });
+        
+        document.getElementById('movie-name').addEventListener('blur', hideSuggestions);
+        
+        function loadSuggestions(query) {
+            if (suggestController) suggestController.abort();
+            suggestController = new AbortController();
+            fetch(`/api/suggest?q=${encodeURIComponent(query)}`, { signal: suggestController.signal })
+                .then(response => response.json())
+                .then(data => renderSuggestions(data.suggestions || []))
+                .catch(() => {});
+        }
+        
+        function renderSuggestions(suggestions) {
+            const suggestionsDiv = document.getElementById('suggestions');
+            if (suggestions.length === 0) {
+                hideSuggestions();
+                return;
+            }
+            suggestionsDiv.innerHTML = suggestions
+                .map(suggestion => `<div class="suggestion">${suggestion.title}</div>`)
+                .join('');
+            suggestionsDiv.querySelectorAll('.suggestion').forEach((item, index) => {
+                // mousedown спрацьовує раніше за blur поля вводу
+                item.addEventListener('mousedown', () => selectSuggestion(suggestions[index]));
+            });
+            suggestionsDiv.style.display = 'block';
+        }
+        
+        function hideSuggestions() {
+            clearTimeout(suggestTimer);
+            document.getElementById('suggestions').style.display = 'none';
+        }
+        
+        function selectSuggestion(suggestion) {
+            // Відомий фільм показуємо одразу, без повного пошуку
+            document.getElementById('movie-name').value = suggestion.title;
+            hideSuggestions();
+            renderResults(suggestion.title, [suggestion]);
+        }
+        
+        function searchFor(query) {
+            document.getElementById('movie-name').value = query;
+            searchMovie();
+        }
+        
+        function renderDidYouMean(didYouMean) {
+            return didYouMean
+                ? `<p class="did-you-mean">Можливо, ви мали на увазі: <a href="#" onclick="searchFor('${didYouMean}'); return false;">${didYouMean}</a></p>`
+                : '';
+        }
+        
+        function renderResultCard(result, index) {
+            return `
+                <div class="result-card">
+                    <h3 class="result-title">${index + 1}. ${result.title || 'Без назви'}</h3>
+                    <p class="result-url"><a href="${result.url}" target="_blank">${result.url}</a></p>
+                    ${result.id ? `<p class="result-id">ID: ${result.id}</p>` : ''}
+                    ${result.is_direct_search ? '<p class="direct-search-note">Пряме посилання для пошуку</p>' : ''}
+                </div>
+            `;
+        }
+        
+        function renderResults(movie, results, didYouMean) {
+            const resultsDiv = document.getElementById('results');
+            if (results && results.length > 0) {
+                let html = `<h2 class="results-title">Результати пошуку для "${movie}":</h2>` + renderDidYouMean(didYouMean);
+                results.forEach((result, index) => {
+                    html += renderResultCard(result, index);
+                });
+                resultsDiv.innerHTML = html;
+            } else {
+                resultsDiv.innerHTML = `<div class="no-results">Нічого не знайдено для "${movie}"</div>` + renderDidYouMean(didYouMean);
+            }
+        }
+        
+        // Читає потокову відповідь NDJSON і викликає onEvent для кожного рядка
+        function readEventStream(response, onEvent) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            function read() {
+                return reader.read().then(({ done, value }) => {
+                    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                    const lines = buffer.split('\\n');
+                    buffer = done ? '' : lines.pop();
+                    lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+                    return done ? null : read();
+                });
+            }
+            return read();
+        }
+        
         function searchMovie() {
             const movieName = document.getElementById('movie-name').value.trim();
             if (!movieName) return;
+            hideSuggestions();
             
             const resultsDiv = document.getElementById('results');
             resultsDiv.innerHTML = '<div class="loading">Шукаємо фільми та серіали...</div>';
             
-            // Додаємо timestamp для запобігання кешуванню
-            const timestamp = new Date().getTime();
-            fetch(`/api/search?movie=${encodeURIComponent(movieName)}&_=${timestamp}`)
+            // Результати приходять потоком: кожну картку показуємо, щойно її джерело відповіло
+            let count = 0;
+            fetch(`/api/search?movie=${encodeURIComponent(movieName)}`, {
+                headers: { 'Accept': 'application/x-ndjson' }
+            })
                 .then(response => {
                     if (!response.ok) {
                         throw new Error(`HTTP error! Status: ${response.status}`);
                     }
-                    return response.json();
-                })
-                .then(data => {
-                    if (data.results && data.results.length > 0) {
-                        let html = `<h2 class="results-title">Результати пошуку для "${data.movie}":</h2>`;
-                        data.results.forEach((result, index) => {
-                            html += `
-                                <div class="result-card">
-                                    <h3 class="result-title">${index + 1}. ${result.title || 'Без назви'}</h3>
-                                    <p class="result-url"><a href="${result.url}" target="_blank">${result.url}</a></p>
-                                    ${result.id ? `<p class="result-id">ID: ${result.id}</p>` : ''}
-                                    ${result.is_direct_search ? '<p class="direct-search-note">Пряме посилання для пошуку</p>' : ''}
-                                </div>
-                            `;
-                        });
-                        resultsDiv.innerHTML = html;
-                    } else {
-                        resultsDiv.innerHTML = `<div class="no-results">Нічого не знайдено для "${data.movie}"</div>`;
-                    }
+                    return readEventStream(response, event => {
+                        if (event.type === 'result') {
+                            if (count === 0) {
+                                resultsDiv.innerHTML = `<h2 class="results-title">Результати пошуку для "${event.movie}":</h2>`;
+                            }
+                            resultsDiv.insertAdjacentHTML('beforeend', renderResultCard(event.result, count));
+                            count += 1;
+                        } else if (event.type === 'done') {
+                            if (count === 0) {
+                                renderResults(event.movie, [], event.did_you_mean);
+                            } else if (event.did_you_mean) {
+                                resultsDiv.querySelector('.results-title').insertAdjacentHTML('afterend', renderDidYouMean(event.did_you_mean));
+                            }
+                        }
+                    });
                 })
                 .catch(error => {
                     console.error('Error:', error);
@@ -388,6 +457,9 @@ HOME_TEMPLATE = """
 </html>
 """
 
+# Головна сторінка не змінюється: кодуємо і стискаємо її один раз
+home_page = StaticPage(HOME_TEMPLATE)
+
 class Handler(BaseHTTPRequestHandler):
     def do_GET(self):
         # Парсимо URL
@@ -405,6 +477,8 @@ class Handler(BaseHTTPRequestHandler):
         # Обробляємо різні шляхи
         if path == '/api/search':
             self.handle_search(query_params)
+        elif path == '/api/suggest':
+            self.handle_suggest(query_params)
         elif path == '/api/info':
             self.handle_info()
         elif path == '/health':
@@ -413,30 +487,146 @@ class Handler(BaseHTTPRequestHandler):
             # Всі інші шляхи повертають головну сторінку
             self.handle_home()
     
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        
+        if path == '/api/search/batch':
+            self.handle_search_batch()
+        else:
+            self.send_error_response(404, {"error": "Endpoint not found"})
+    
+    def read_json_body(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+        except (ValueError, UnicodeDecodeError):
+            return {}
+    
+    def handle_search_batch(self):
+        deadline = Deadline()
+        data = self.read_json_body()
+        movie_names = data.get('movies') if isinstance(data, dict) else None
+        
+        if not isinstance(movie_names, list) or not movie_names or not all(isinstance(name, str) and name for name in movie_names):
+            self.send_error_response(400, {"error": "Очікується JSON зі списком назв фільмів у полі movies"})
+            return
+        if len(movie_names) > BATCH_MAX_TITLES:
+            self.send_error_response(400, {"error": f"Забагато назв в одному запиті (максимум {BATCH_MAX_TITLES})"})
+            return
+        
+        stream_mimetype = negotiate_stream(self.headers.get('Accept'))
+        if stream_mimetype:
+            self.send_stream_response(stream_mimetype, self.iter_search_batch_events(movie_names, deadline))
+            return
+        
+        # Шукаємо всі назви (однакові - один раз), результати в порядку запиту
+        batch_results = search_movies_batch(movie_names, deadline=deadline)
+        
+        items = []
+        for movie_name, results in zip(movie_names, batch_results):
+            items.append({
+                "movie": movie_name,
+                "results": results or [build_direct_search_result(movie_name)]
+            })
+        
+        self.send_json_response(200, {"results": items})
+    
     def handle_search(self, query_params):
+        # Усі запити до API в межах цього запиту користуються одним бюджетом часу
+        deadline = Deadline()
         movie_name = query_params.get('movie', '')
         
         if not movie_name:
             self.send_error_response(400, {"error": "Не вказано назву фільму"})
             return
         
+        # Посторінковий режим, якщо вказано page або limit
+        pagination = None
+        if 'page' in query_params or 'limit' in query_params:
+            pagination = (self.read_int_param(query_params, 'page', 1, 1, None),
+                          self.read_int_param(query_params, 'limit', SEARCH_PAGE_SIZE, 1, SEARCH_MAX_LIMIT))
+        
+        # Деталі фільмів (постер, рейтинги, тривалість) для перших результатів
+        with_details = query_params.get('details') == '1'
+        
+        # Пошук одночасно через API і сторінку пошуку Кінопошуку (лише без пагінації)
+        multi_source = query_params.get('sources', 'all' if SEARCH_MULTI_SOURCE else 'api') == 'all'
+        
+        # Потоковий режим (NDJSON або Server-Sent Events) за заголовком Accept
+        stream_mimetype = negotiate_stream(self.headers.get('Accept'))
+        
+        # Потік починається до кінця пошуку, тож ETag і заголовки кешування є лише у звичайної JSON-відповіді
+        if stream_mimetype:
+            self.send_stream_response(stream_mimetype, iter_search_events(movie_name, pagination, with_details, deadline, multi_source))
+            return
+        
+        # Готова JSON-відповідь на такий самий нещодавній запит (без пошуку і серіалізації)
+        response_key = f"{pagination}:{with_details}:{multi_source}:{movie_name}"
+        cached_response = response_cache.get(response_key)
+        if cached_response is not None:
+            self.send_serialized_response(cached_response)
+            return
+        
         # Шукаємо через API Кінопошуку
-        results = search_movie_kinopoisk_api(movie_name)
-        
-        # Якщо результатів немає, створюємо пряме посилання
-        if not results:
-            direct_url = create_direct_search_url(movie_name)
-            results = [{
-                "title": f"Пошук для: {movie_name}",
-                "url": direct_url,
-                "id": None,
-                "is_direct_search": True
-            }]
+        results, page_info = search_results(movie_name, pagination, with_details, deadline, multi_source)
+        did_you_mean = title_index.did_you_mean(movie_name)
+        
+        # Однакові результати - однаковий ETag, тож CDN і браузер можуть перевикористати відповідь
+        headers = search_cache_headers(
+            results, compute_etag(JSON_MIMETYPE, movie_name, results, page_info, did_you_mean),
+            deadline, page_info.get("sources")
+        )
+        if etag_matches(self.headers.get('If-None-Match'), headers["ETag"]):
+            self.send_not_modified(headers)
+            return
         
         # Формуємо відповідь
         response = {
             "movie": movie_name,
-            "results": results
+            "results": results,
+            **page_info,
+            "did_you_mean": did_you_mean
+        }
+        
+        cached_response = {"body": serialize_json(response), "headers": headers}
+        response_cache.set(response_key, cached_response, ttl=search_response_ttl(results, deadline, page_info.get("sources")))
+        self.send_serialized_response(cached_response)
+    
+    def read_int_param(self, query_params, name, default, minimum, maximum):
+        try:
+            value = int(query_params.get(name, default))
+        except ValueError:
+            value = default
+        value = max(minimum, value)
+        return min(value, maximum) if maximum is not None else value
+    
+    def iter_search_batch_events(self, movie_names, deadline=None):
+        yield {"type": "start", "count": len(movie_names)}
+        
+        # Результати йдуть у порядку готовності, index - позиція назви в запиті
+        for position, results in iter_search_movies_batch(movie_names, deadline=deadline):
+            movie_name = movie_names[position]
+            yield {
+                "type": "result",
+                "index": position,
+                "movie": movie_name,
+                "results": results or [build_direct_search_result(movie_name)]
+            }
+        
+        yield {"type": "done", "count": len(movie_names)}
+    
+    def handle_suggest(self, query_params):
+        query = query_params.get('q', '')
+        try:
+            limit = int(query_params.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            limit = SUGGEST_DEFAULT_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        
+        # Підказки беремо лише з уже відомих назв, без запитів до API
+        response = {
+            "query": query,
+            "suggestions": title_index.suggest(query, limit)
         }
         
         self.send_json_response(200, response)
@@ -451,9 +641,30 @@ class Handler(BaseHTTPRequestHandler):
                     "path": "/api/search",
                     "method": "GET",
                     "params": {
-                        "movie": "Назва фільму для пошуку"
+                        "movie": "Назва фільму для пошуку",
+                        "page": "Номер сторінки (необов'язково)",
+                        "limit": f"Кількість результатів на сторінці (до {SEARCH_MAX_LIMIT}, необов'язково)",
+                        "details": f"1 - додати постер, рейтинги і тривалість для перших {DETAILS_MAX_FILMS} результатів",
+                        "sources": "all - шукати одночасно через API і сторінку пошуку Кінопошуку (без page/limit)"
+                    },
+                    "description": "Пошук фільмів за назвою (Accept: application/x-ndjson або text/event-stream - потокова відповідь)"
+                },
+                {
+                    "path": "/api/search/batch",
+                    "method": "POST",
+                    "params": {
+                        "movies": f"Список назв фільмів у тілі JSON (до {BATCH_MAX_TITLES})"
                     },
-                    "description": "Пошук фільмів за назвою"
+                    "description": "Пакетний пошук фільмів, результати в порядку запиту (у потоковому режимі - в порядку готовності)"
+                },
+                {
+                    "path": "/api/suggest",
+                    "method": "GET",
+                    "params": {
+                        "q": "Початок назви фільму",
+                        "limit": f"Кількість підказок (до {SUGGEST_MAX_LIMIT})"
+                    },
+                    "description": "Підказки під час введення назви"
                 },
                 {
                     "path": "/health",
@@ -470,22 +681,72 @@ class Handler(BaseHTTPRequestHandler):
             "status": "ok",
             "timestamp": time.time(),
             "service": "SSPoisk API",
-            "version": "1.0.0"
+            "version": "1.0.0",
+            "cache": search_cache.stats(),
+            "inflight": inflight_requests.stats(),
+            "refresh": cache_refresher.stats(),
+            "negative_cache": negative_cache.stats(),
+            "error_cache": error_cache.stats(),
+            "circuit_breaker": api_breaker.stats(),
+            "api_keys": api_key_pool.stats(),
+            "hedging": api_hedger.stats(),
+            "sources": multi_source_search.stats(),
+            "title_index": title_index.stats(),
+            "film_store": film_store.stats(),
+            "details_cache": details_cache.stats(),
+            "compressed_bodies": compressed_bodies.stats(),
+            "response_cache": response_cache.stats()
         }
         
         self.send_json_response(200, health)
     
     def handle_home(self):
+        encoding = home_page.negotiate(self.headers.get('Accept-Encoding'))
+        if etag_matches(self.headers.get('If-None-Match'), home_page.etags[encoding]):
+            self.send_not_modified(home_page.headers(encoding, include_body=False))
+            return
         self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
+        for header, value in home_page.headers(encoding).items():
+            self.send_header(header, value)
         self.end_headers()
-        self.wfile.write(HOME_TEMPLATE.encode('utf-8'))
+        self.wfile.write(home_page.variants[encoding])
     
-    def send_json_response(self, status_code, data):
+    def send_json_response(self, status_code, data, headers=None):
+        self.send_body_response(status_code, serialize_json(data), headers or {})
+    
+    def send_serialized_response(self, cached_response):
+        headers = cached_response["headers"]
+        if etag_matches(self.headers.get('If-None-Match'), headers["ETag"]):
+            self.send_not_modified(headers)
+            return
+        self.send_body_response(200, cached_response["body"], headers)
+    
+    def send_body_response(self, status_code, body, headers):
+        # Стиснуті тіла відповідей з ETag кешуються, тож гарячі запити не стискаються повторно
+        body, headers = encode_response(body, headers, self.headers.get('Accept-Encoding'))
+        
         self.send_response(status_code)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_not_modified(self, headers):
+        self.send_response(304)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+    
+    def send_stream_response(self, mimetype, events):
+        self.send_response(200)
+        for header, value in stream_headers(mimetype).items():
+            self.send_header(header, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        for event in events:
+            self.wfile.write(format_stream_event(mimetype, event))
+            self.wfile.flush()
     
     def send_error_response(self, status_code, error_data):
         self.send_response(status_code)
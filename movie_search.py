@@ -2,23 +2,135 @@ import requests
 from bs4 import BeautifulSoup
 import urllib.parse
 import re
-import json
 import os
 import time
-
-# Перевіряємо, чи встановлено змінну середовища для API ключа
-KINOPOISK_API_KEY = os.environ.get('KINOPOISK_API_KEY', '6ca43889-42a5-4ef4-8de7-ab98315826d3')
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, TimeoutError as FutureTimeoutError
+from cache import LRUCache, DiskCache, TieredCache, NegativeCache, SingleFlight, BackgroundRefresher, DEFAULT_DISK_CACHE_PATH
+from query_normalizer import query_cache_key
+from title_index import TitleIndex
+from film_store import FilmStore
+from upstream import http_get, api_get, is_cacheable_error, DeadlineExceededError, CachedUpstreamError
+from search_sources import MultiSourceSearch
 
 # Кеш для результатів пошуку (для зменшення навантаження на API)
-search_cache = {}
-CACHE_EXPIRY = 3600  # 1 година в секундах
+CACHE_EXPIRY = 3600  # 1 година в секундах; після цього результат оновлюється у фоні
+CACHE_STALE_EXPIRY = int(os.environ.get('SEARCH_CACHE_STALE_TTL', '86400'))  # після цього - лише синхронний запит
+CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '2048'))
+CACHE_MAX_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+search_cache = LRUCache(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_STALE_EXPIRY)
+
+# Необов'язковий дисковий рівень кешу, що переживає холодний старт
+CACHE_DISK_ENABLED = os.environ.get('SEARCH_CACHE_DISK', '0') == '1'
+CACHE_DISK_PATH = os.environ.get('SEARCH_CACHE_DISK_PATH', DEFAULT_DISK_CACHE_PATH)
+CACHE_SNAPSHOT_PATH = os.environ.get('SEARCH_CACHE_SNAPSHOT')  # знімок кешу для "теплого" старту
+
+if CACHE_DISK_ENABLED:
+    search_cache = TieredCache(search_cache, DiskCache(CACHE_DISK_PATH, ttl=CACHE_STALE_EXPIRY))
+
+# Короткочасний кеш порожніх результатів і помилок API
+NEGATIVE_CACHE_EXPIRY = int(os.environ.get('NEGATIVE_CACHE_TTL', '600'))
+ERROR_CACHE_EXPIRY = int(os.environ.get('ERROR_CACHE_TTL', '30'))
+NEGATIVE_CACHE_CAPACITY = int(os.environ.get('NEGATIVE_CACHE_CAPACITY', '100000'))
+negative_cache = NegativeCache(ttl=NEGATIVE_CACHE_EXPIRY, capacity=NEGATIVE_CACHE_CAPACITY)
+error_cache = NegativeCache(ttl=ERROR_CACHE_EXPIRY, capacity=NEGATIVE_CACHE_CAPACITY)
+
+# Кожен фільм зберігається один раз; записи кешу пошуку тримають лише списки ID
+FILM_STORE_DISK_PATH = os.environ.get('FILM_STORE_DISK_PATH', f"{os.path.splitext(CACHE_DISK_PATH)[0]}_films.sqlite3")
+film_store = FilmStore()
+if CACHE_DISK_ENABLED:
+    film_store = FilmStore(disk=DiskCache(FILM_STORE_DISK_PATH, ttl=CACHE_STALE_EXPIRY, max_entries=film_store.max_films))
+
+# Локальний індекс назв з усіх відповідей API
+title_index = TitleIndex()
+
+def export_cache_snapshot(path):
+    """
+    Зберігає кеш пошуку у знімок разом із самими фільмами
+
+    Записи кешу тримають лише ID, тому кожен запис знімка містить фільми,
+    на які посилається, - теплий старт не залежить від сховища фільмів на диску
 
-def search_movie_kinopoisk(movie_name):
+    Returns:
+        int: Кількість збережених записів
+    """
+    return search_cache.export_snapshot(path, encode=_snapshot_entry)
+
+def import_cache_snapshot(path):
+    """
+    Завантажує знімок, створений export_cache_snapshot, у кеш пошуку і сховище фільмів
+
+    Returns:
+        int: Кількість завантажених записів
+    """
+    return search_cache.import_snapshot(path, decode=_restore_snapshot_entry)
+
+def _snapshot_entry(cache_entry):
+    if 'ids' not in cache_entry:
+        return cache_entry
+    films = [film_store.get(film_id) for film_id in cache_entry['ids']]
+    # Фільм уже витіснено зі сховища - запис однаково став би промахом кешу
+    if any(film is None for film in films):
+        return None
+    snapshot_entry = {key: value for key, value in cache_entry.items() if key != 'ids'}
+    snapshot_entry['films'] = [[film.id] + film.as_tuple() for film in films]
+    return snapshot_entry
+
+def _restore_snapshot_entry(snapshot_entry):
+    if 'films' not in snapshot_entry:
+        return snapshot_entry
+    cache_entry = {key: value for key, value in snapshot_entry.items() if key != 'films'}
+    cache_entry['ids'] = [film_store.add(*film).id for film in snapshot_entry['films']]
+    return cache_entry
+
+if CACHE_SNAPSHOT_PATH and os.path.exists(CACHE_SNAPSHOT_PATH):
+    try:
+        import_cache_snapshot(CACHE_SNAPSHOT_PATH)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Не вдалося завантажити знімок кешу: {e}")
+
+# Пакетний пошук: максимум назв в одному запиті і одночасних запитів до API
+BATCH_MAX_TITLES = int(os.environ.get('BATCH_MAX_TITLES', '500'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
+
+# Посторінковий пошук: API віддає по UPSTREAM_PAGE_SIZE фільмів на сторінку
+UPSTREAM_PAGE_SIZE = 20
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', '100'))
+SEARCH_PREFETCH_NEXT_PAGE = os.environ.get('SEARCH_PREFETCH_NEXT_PAGE', '1') == '1'
+
+# Запити до API, що виконуються зараз (ключ - ключ кешу)
+inflight_requests = SingleFlight()
+
+# Фонове оновлення застарілих результатів
+cache_refresher = BackgroundRefresher()
+
+# Пошук одночасно через API і сторінку пошуку Кінопошуку (за замовчуванням - лише API)
+SEARCH_MULTI_SOURCE = os.environ.get('SEARCH_MULTI_SOURCE', '0') == '1'
+multi_source_search = MultiSourceSearch({
+    "api": lambda movie_name, deadline: search_movie_kinopoisk_api(movie_name, deadline, raise_errors=True),
+    "html": lambda movie_name, deadline: search_movie_kinopoisk(movie_name, deadline, raise_errors=True)
+})
+
+# Деталі фільмів (постер, рейтинги, тривалість) кешуються за ID окремо від кешу пошуку
+DETAILS_CACHE_EXPIRY = int(os.environ.get('DETAILS_CACHE_TTL', str(7 * 24 * 3600)))
+DETAILS_CACHE_MAX_ENTRIES = int(os.environ.get('DETAILS_CACHE_MAX_ENTRIES', '50000'))
+DETAILS_MAX_FILMS = int(os.environ.get('DETAILS_MAX_FILMS', '10'))  # скільки перших результатів доповнювати
+DETAILS_CONCURRENCY = int(os.environ.get('DETAILS_CONCURRENCY', '5'))
+DETAILS_TIMEOUT = float(os.environ.get('DETAILS_TIMEOUT', '2.5'))  # загальний час на доповнення відповіді
+DETAILS_DISK_PATH = os.environ.get('DETAILS_DISK_PATH', f"{os.path.splitext(CACHE_DISK_PATH)[0]}_details.sqlite3")
+details_cache = LRUCache(max_entries=DETAILS_CACHE_MAX_ENTRIES, ttl=DETAILS_CACHE_EXPIRY)
+if CACHE_DISK_ENABLED:
+    details_cache = TieredCache(details_cache, DiskCache(DETAILS_DISK_PATH, ttl=DETAILS_CACHE_EXPIRY,
+                                                         max_entries=DETAILS_CACHE_MAX_ENTRIES))
+
+def search_movie_kinopoisk(movie_name, deadline=None, raise_errors=False):
     """
     Шукає фільм безпосередньо на Кінопошуку
     
     Args:
         movie_name (str): Назва фільму для пошуку
+        deadline (Deadline): Бюджет часу запиту (None - без обмеження)
+        raise_errors (bool): Кидати помилку запиту замість порожнього списку
     
     Returns:
         list: Список результатів з посиланнями на sspoisk.ru
@@ -42,13 +154,9 @@ def search_movie_kinopoisk(movie_name):
     
     try:
         # Виконуємо запит до Кінопошуку
-        response = requests.get(search_url, headers=headers)
+        response = http_get(search_url, headers=headers, deadline=deadline)
         response.raise_for_status()
         
-        # Зберігаємо HTML для відлагодження
-        with open("kinopoisk_results.html", "w", encoding="utf-8") as f:
-            f.write(response.text)
-        
         # Парсимо HTML-відповідь
         soup = BeautifulSoup(response.text, 'html.parser')
         
@@ -109,83 +217,413 @@ def search_movie_kinopoisk(movie_name):
         
         return unique_results
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, DeadlineExceededError) as e:
         print(f"Помилка при виконанні запиту до Кінопошуку: {e}")
+        if raise_errors:
+            raise
         return []
 
-def search_movie_kinopoisk_api(movie_name):
+def search_movie_kinopoisk_api(movie_name, deadline=None, raise_errors=False):
     """
     Шукає фільм через неофіційний API Кінопошуку
     
     Args:
         movie_name (str): Назва фільму для пошуку
+        deadline (Deadline): Бюджет часу запиту (None - без обмеження)
+        raise_errors (bool): Кидати помилку запиту замість порожнього списку
     
     Returns:
         list: Список результатів з посиланнями на sspoisk.ru
     """
-    # Перевіряємо кеш
-    cache_key = movie_name.lower()
-    current_time = time.time()
+    # Нормалізований запит - лише ключ кешу; до API йде запит як його ввели
+    query = movie_name.strip()
+    cache_key = query_cache_key(query)
+    cached_results = _cached_results(cache_key, query)
+    if cached_results is not None:
+        return cached_results
+    
+    # Нещодавно цей запит нічого не знайшов - пробуємо лише виправлений
+    if cache_key in negative_cache:
+        return _search_corrected(cache_key, deadline, raise_errors)
     
-    if cache_key in search_cache:
-        cache_entry = search_cache[cache_key]
-        if current_time - cache_entry['timestamp'] < CACHE_EXPIRY:
-            return cache_entry['results']
+    # Знайомі назви знаходимо в локальному індексі без запиту до API (зокрема, коли API недоступний)
+    local_results = title_index.lookup(cache_key)
+    if local_results is not None:
+        return local_results
+    
+    # Нещодавно цей запит завершився помилкою
+    if cache_key in error_cache:
+        if raise_errors:
+            raise CachedUpstreamError(f"Запит {cache_key!r} нещодавно завершився помилкою")
+        return []
     
     try:
-        # Кодуємо назву фільму для URL
-        encoded_query = urllib.parse.quote(movie_name)
-        
-        # Використовуємо неофіційний API Кінопошуку
-        search_url = f"https://kinopoiskapiunofficial.tech/api/v2.1/films/search-by-keyword?keyword={encoded_query}"
-        
-        # Заголовки для API
-        headers = {
-            "X-API-KEY": KINOPOISK_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        
-        for item in data.get("films", []):
-            film_id = item.get("filmId")
-            title = item.get("nameRu") or item.get("nameEn") or "Невідома назва"
-            year = item.get("year", "")
-            film_type = item.get("type", "").lower()
-            
-            # Визначаємо тип (фільм чи серіал)
-            path_type = "film"
-            if film_type in ["tv_series", "mini_series", "tv_show"]:
-                path_type = "series"
-            
-            # Формуємо посилання на Кінопошук
-            kinopoisk_url = f"https://www.kinopoisk.ru/{path_type}/{film_id}/"
-            # Замінюємо на sspoisk.ru
-            sspoisk_url = kinopoisk_url.replace("kinopoisk.ru", "sspoisk.ru")
-            
-            results.append({
-                "title": f"{title} ({year})" if year else title,
-                "url": sspoisk_url,
-                "id": str(film_id),
-                "year": year,
-                "type": film_type
-            })
-        
-        # Зберігаємо результати в кеш
-        search_cache[cache_key] = {
-            'results': results,
-            'timestamp': current_time
-        }
-        
-        return results
+        results = _fetch_shared(cache_key, query, deadline)
     
     except Exception as e:
+        if is_cacheable_error(e):
+            error_cache.add(cache_key)
         print(f"Помилка при виконанні запиту до API Кінопошуку: {e}")
+        if raise_errors:
+            raise
         return []
+    
+    # Виправлений запит йде до API, лише якщо оригінальний нічого не знайшов
+    if not results:
+        return _search_corrected(cache_key, deadline, raise_errors)
+    return results
+
+def _search_corrected(cache_key, deadline=None, raise_errors=False):
+    # Опечатки виправляємо за словами відомих назв, лише коли оригінальний запит нічого не знайшов
+    corrected_key = title_index.correct(cache_key) or cache_key
+    if corrected_key == cache_key:
+        return []
+    return search_movie_kinopoisk_api(corrected_key, deadline, raise_errors)
+
+def search_movie_kinopoisk_api_page(movie_name, page=1, limit=SEARCH_PAGE_SIZE, deadline=None):
+    """
+    Повертає одну сторінку результатів пошуку через API Кінопошуку
+    
+    Сторінки API завантажуються ліниво - лише ті, що перетинаються з вікном
+    (page, limit), - і кешуються окремо за (запит, сторінка API), тож глибокі
+    сторінки не потребують повторного завантаження попередніх. Сторінки,
+    потрібні для наступного вікна, за потреби завантажуються у фоні.
+    Локальний індекс тут не використовується, бо він не знає порядку сторінок API.
+    Якщо бюджет часу вичерпано, повертаються сторінки, завантажені до цього.
+    
+    Args:
+        movie_name (str): Назва фільму для пошуку
+        page (int): Номер сторінки (з 1)
+        limit (int): Кількість результатів на сторінці
+        deadline (Deadline): Бюджет часу запиту (None - без обмеження)
+    
+    Returns:
+        dict: Результати сторінки, page, limit і has_next (чи є наступна сторінка)
+    """
+    query = movie_name.strip()
+    cache_key = query_cache_key(query)
+    offset = (page - 1) * limit
+    first_page = offset // UPSTREAM_PAGE_SIZE + 1
+    last_page = (offset + limit - 1) // UPSTREAM_PAGE_SIZE + 1
+    
+    # Кількість сторінок відома з першої сторінки, якщо вона вже в кеші
+    first_entry = search_cache.get(cache_key) if first_page > 1 else None
+    pages_count = first_entry.get('pages_count', 1) if first_entry else None
+    
+    collected = []
+    if cache_key not in negative_cache:
+        for upstream_page in range(first_page, last_page + 1):
+            if pages_count is not None and upstream_page > pages_count:
+                break
+            page_entry = _get_page(cache_key, query, upstream_page, deadline)
+            if page_entry is None:
+                break
+            pages_count = page_entry.get('pages_count', 1)
+            collected.extend(page_entry['results'])
+    pages_count = pages_count or 0
+    
+    # Запит, що нічого не знайшов, пробуємо виправити за словами відомих назв
+    if not collected and cache_key in negative_cache:
+        corrected_key = title_index.correct(cache_key) or cache_key
+        if corrected_key != cache_key:
+            return search_movie_kinopoisk_api_page(corrected_key, page, limit, deadline)
+    
+    start = offset - (first_page - 1) * UPSTREAM_PAGE_SIZE
+    results = collected[start:start + limit]
+    has_next = last_page < pages_count or len(collected) > start + limit
+    
+    if has_next and SEARCH_PREFETCH_NEXT_PAGE:
+        next_last_page = min((offset + 2 * limit - 1) // UPSTREAM_PAGE_SIZE + 1, pages_count)
+        for upstream_page in range(last_page + 1, next_last_page + 1):
+            _prefetch_page(cache_key, query, upstream_page)
+    
+    return {
+        "results": results,
+        "page": page,
+        "limit": limit,
+        "has_next": has_next
+    }
+
+def search_movies_batch(movie_names, max_workers=BATCH_CONCURRENCY, deadline=None):
+    """
+    Шукає кілька фільмів одночасно
+    
+    Однакові після нормалізації назви шукаються один раз, результати з кешу
+    повертаються одразу, а решта запитів виконується паралельно, але не
+    більше max_workers одночасно.
+    
+    Args:
+        movie_names (list): Назви фільмів для пошуку
+        max_workers (int): Максимальна кількість одночасних запитів до API
+        deadline (Deadline): Бюджет часу запиту; назви, що не встигли, отримують []
+    
+    Returns:
+        list: Списки результатів у порядку вхідних назв
+    """
+    batch_results = [None] * len(movie_names)
+    for position, results in iter_search_movies_batch(movie_names, max_workers, deadline):
+        batch_results[position] = results
+    return batch_results
+
+def iter_search_movies_batch(movie_names, max_workers=BATCH_CONCURRENCY, deadline=None):
+    """
+    Те саме, що search_movies_batch, але віддає результати, щойно вони готові
+    
+    Yields:
+        tuple: (позиція назви у вхідному списку, список результатів)
+    """
+    positions = {}
+    queries = {}  # ключ кешу -> перший запит з цим ключем, як його ввели
+    for position, movie_name in enumerate(movie_names):
+        query = movie_name.strip()
+        cache_key = query_cache_key(query)
+        positions.setdefault(cache_key, []).append(position)
+        queries.setdefault(cache_key, query)
+    
+    missing_keys = []
+    for cache_key, key_positions in positions.items():
+        cached_results = _cached_results(cache_key, queries[cache_key])
+        if cached_results is None:
+            missing_keys.append(cache_key)
+            continue
+        for position in key_positions:
+            yield position, cached_results
+    
+    if missing_keys:
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(missing_keys)))
+        futures = {executor.submit(search_movie_kinopoisk_api, queries[cache_key], deadline): cache_key for cache_key in missing_keys}
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=deadline.remaining() if deadline else None):
+                pending.discard(future)
+                for position in positions[futures[future]]:
+                    yield position, future.result()
+        except FutureTimeoutError:
+            # Назви, що не встигли до кінця бюджету, повертаються без результатів
+            for future in pending:
+                for position in positions[futures[future]]:
+                    yield position, []
+        finally:
+            executor.shutdown(wait=deadline is None, cancel_futures=deadline is not None)
+
+def page_cache_key(cache_key, page):
+    # Перша сторінка зберігається під ключем самого запиту
+    return cache_key if page == 1 else f"{cache_key}#page={page}"
+
+def enrich_with_details(results, max_films=DETAILS_MAX_FILMS, timeout=DETAILS_TIMEOUT, deadline=None):
+    """
+    Доповнює перші max_films результатів деталями фільмів (постер, рейтинги, тривалість)
+    
+    Деталі з кешу додаються одразу, решта завантажується паралельно, але не
+    більше DETAILS_CONCURRENCY одночасно і не довше timeout секунд. Запити, що
+    не встигли, завершуються у фоні й потрапляють у кеш для наступних відповідей.
+    
+    Args:
+        results (list): Результати пошуку
+        max_films (int): Скільки перших результатів доповнювати
+        timeout (float): Максимальний час очікування деталей
+        deadline (Deadline): Бюджет часу запиту (чекаємо не довше, ніж лишилося)
+    
+    Returns:
+        list: Нові dict результатів з полем details ({} - деталей у API немає,
+            None - їх не вдалося завантажити вчасно)
+    """
+    film_ids = [result["id"] for result in results[:max_films] if result.get("id")]
+    details = dict(iter_film_details(film_ids, timeout, deadline))
+    return [
+        {**result, "details": details.get(result.get("id"))} if position < max_films else result
+        for position, result in enumerate(results)
+    ]
+
+def iter_film_details(film_ids, timeout=DETAILS_TIMEOUT, deadline=None):
+    """
+    Віддає деталі фільмів, щойно вони готові: спершу з кешу, потім у порядку завантаження
+    
+    Фільми, деталі яких не вдалося завантажити вчасно, пропускаються.
+    
+    Yields:
+        tuple: (ID фільму, деталі; {} - деталей у API немає)
+    """
+    missing_ids = []
+    for film_id in dict.fromkeys(film_ids):
+        cached_details = details_cache.get(film_id)
+        if cached_details is not None:
+            yield film_id, cached_details
+        elif f"details:{film_id}" not in error_cache:
+            missing_ids.append(film_id)
+    
+    if deadline is not None:
+        timeout = min(timeout, deadline.remaining())
+        if deadline.exhausted():
+            missing_ids = []
+    if not missing_ids:
+        return
+    
+    executor = ThreadPoolExecutor(max_workers=min(DETAILS_CONCURRENCY, len(missing_ids)))
+    futures = {executor.submit(_fetch_details_shared, film_id, deadline): film_id for film_id in missing_ids}
+    # Не чекаємо на запити, що не встигли: вони доповнять кеш у фоні
+    executor.shutdown(wait=False)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                film_details = future.result()
+            except Exception as e:
+                if is_cacheable_error(e):
+                    error_cache.add(f"details:{futures[future]}")
+                print(f"Помилка при отриманні деталей фільму {futures[future]}: {e}")
+                continue
+            yield futures[future], film_details
+    except FutureTimeoutError:
+        pass
+
+def _fetch_details_shared(film_id, deadline=None):
+    def fetch():
+        try:
+            film_details = fetch_film_details(film_id, deadline)
+        except Exception as e:
+            # Фільму без сторінки деталей запам'ятовуємо порожні деталі
+            if getattr(getattr(e, "response", None), "status_code", None) != 404:
+                raise
+            film_details = {}
+        details_cache.set(film_id, film_details)
+        return film_details
+    
+    # Той самий фільм з кількох одночасних запитів завантажується один раз
+    return inflight_requests.do(f"details:{film_id}", fetch, timeout=deadline.remaining() if deadline else None)
+
+def _cached_results(cache_key, query):
+    cache_entry = _cached_page(cache_key, query, 1)
+    return cache_entry['results'] if cache_entry is not None else None
+
+def _cached_page(cache_key, query, page):
+    cache_entry = search_cache.get(page_cache_key(cache_key, page))
+    if cache_entry is None:
+        return None
+    
+    # Результати будуються зі сховища фільмів; записи старого формату містять їх повністю
+    if 'ids' in cache_entry:
+        results = film_store.results(cache_entry['ids'])
+    else:
+        results = cache_entry['results']
+    
+    # Якогось фільму вже немає в сховищі - вважаємо це промахом кешу
+    if results is None:
+        return None
+    
+    # Застарілий результат віддаємо одразу, а оновлюємо його у фоні
+    if time.time() - cache_entry['timestamp'] >= CACHE_EXPIRY:
+        cache_refresher.schedule(page_cache_key(cache_key, page), lambda: _fetch_page_shared(cache_key, query, page))
+    return {'results': results, 'pages_count': cache_entry.get('pages_count', 1)}
+
+def _get_page(cache_key, query, page, deadline=None):
+    # Сторінка з кешу або з API; None, якщо запит завершився помилкою
+    cache_entry = _cached_page(cache_key, query, page)
+    if cache_entry is not None:
+        return cache_entry
+    
+    key = page_cache_key(cache_key, page)
+    if key in error_cache:
+        return None
+    try:
+        return _fetch_page_shared(cache_key, query, page, deadline)
+    except Exception as e:
+        if is_cacheable_error(e):
+            error_cache.add(key)
+        print(f"Помилка при виконанні запиту до API Кінопошуку: {e}")
+        return None
+
+def _prefetch_page(cache_key, query, page):
+    key = page_cache_key(cache_key, page)
+    if search_cache.get(key) is None and key not in error_cache:
+        cache_refresher.schedule(key, lambda: _fetch_page_shared(cache_key, query, page))
+
+def _fetch_shared(cache_key, query, deadline=None):
+    return _fetch_page_shared(cache_key, query, 1, deadline)['results']
+
+def _fetch_page_shared(cache_key, query, page, deadline=None):
+    # Одночасні однакові (після нормалізації) запити чекають на один виклик API (але не довше свого бюджету);
+    # до API йде запит першого з них без нормалізації
+    return inflight_requests.do(page_cache_key(cache_key, page), lambda: _fetch_and_cache(cache_key, query, page, deadline),
+                                timeout=deadline.remaining() if deadline else None)
+
+def _fetch_and_cache(cache_key, query, page=1, deadline=None):
+    key = page_cache_key(cache_key, page)
+    api_page = fetch_kinopoisk_api_page(query, page, deadline)
+    films = api_page['films']
+    
+    # Порожні результати не займають місця в основному кеші
+    if not films:
+        search_cache.delete(key)
+        if page == 1:
+            negative_cache.add(cache_key)
+    else:
+        # Зберігаємо в кеш лише ID фільмів
+        search_cache.set(key, {
+            'ids': [film.id for film in films],
+            'pages_count': api_page['pages_count'],
+            'timestamp': time.time()
+        })
+    
+    return {'results': [film.as_result() for film in films], 'pages_count': api_page['pages_count']}
+
+def fetch_kinopoisk_api_page(movie_name, page=1, deadline=None):
+    """
+    Виконує запит однієї сторінки до неофіційного API Кінопошуку без кешування
+    
+    Помилки запиту не перехоплюються, щоб їх отримали всі, хто чекає на результат
+    
+    Returns:
+        dict: {'films': записи FilmRecord, 'pages_count': кількість сторінок в API}
+    """
+    # Кодуємо назву фільму для URL
+    encoded_query = urllib.parse.quote(movie_name)
+    
+    # Використовуємо неофіційний API Кінопошуку
+    search_url = f"https://kinopoiskapiunofficial.tech/api/v2.1/films/search-by-keyword?keyword={encoded_query}"
+    if page > 1:
+        search_url += f"&page={page}"
+    
+    # Заголовки для API (ключ API додається з пулу ключів)
+    headers = {
+        "Content-Type": "application/json"
+    }
+    
+    response = api_get(search_url, headers=headers, deadline=deadline)
+    data = response.json()
+    
+    films = []
+    
+    for item in data.get("films", []):
+        title = item.get("nameRu") or item.get("nameEn") or "Невідома назва"
+        
+        # Фільм зберігається один раз; посилання на sspoisk.ru будується під час відповіді
+        film = film_store.add(str(item.get("filmId")), title, item.get("year", ""), item.get("type", "").lower())
+        films.append(film)
+        title_index.add(film.id, [item.get("nameRu"), item.get("nameEn")], film)
+    
+    return {
+        'films': films,
+        'pages_count': data.get("pagesCount") or 1
+    }
+
+def fetch_film_details(film_id, deadline=None):
+    """
+    Завантажує деталі фільму з неофіційного API Кінопошуку без кешування
+    
+    Returns:
+        dict: Постер, рейтинги, тривалість (у хвилинах) і жанри
+    """
+    details_url = f"https://kinopoiskapiunofficial.tech/api/v2.2/films/{urllib.parse.quote(str(film_id))}"
+    response = api_get(details_url, headers={"Content-Type": "application/json"}, deadline=deadline)
+    data = response.json()
+    
+    return {
+        "poster": data.get("posterUrlPreview") or data.get("posterUrl"),
+        "rating_kinopoisk": data.get("ratingKinopoisk"),
+        "rating_imdb": data.get("ratingImdb"),
+        "duration": data.get("filmLength"),
+        "genres": [item["genre"] for item in data.get("genres") or [] if item.get("genre")]
+    }
 
 def extract_id_from_url(url):
     """
@@ -204,6 +642,17 @@ def create_direct_search_url(movie_name):
     encoded_query = urllib.parse.quote(movie_name)
     return f"https://sspoisk.ru/index.php?kp_query={encoded_query}"
 
+def build_direct_search_result(movie_name):
+    """
+    Створює результат з прямим посиланням для пошуку (коли нічого не знайдено)
+    """
+    return {
+        "title": f"Пошук для: {movie_name}",
+        "url": create_direct_search_url(movie_name),
+        "id": None,
+        "is_direct_search": True
+    }
+
 def main():
     movie_name = input("Введіть назву фільму для пошуку: ")
     
@@ -0,0 +1,55 @@
+import os
+import re
+import unicodedata
+
+# Чи замінювати латинські літери, схожі на кириличні, у словах зі змішаним алфавітом
+FOLD_LOOKALIKES = os.environ.get('QUERY_FOLD_LOOKALIKES', '1') == '1'
+
+# Латинські літери, які виглядають як кириличні
+LATIN_TO_CYRILLIC = str.maketrans({
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "i": "і", "k": "к",
+    "m": "м", "o": "о", "p": "р", "t": "т", "x": "х", "y": "у"
+})
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_CYRILLIC_RE = re.compile(r"[Ѐ-ӿ]")
+_LATIN_RE = re.compile(r"[a-z]")
+
+def _strip_punctuation(text):
+    # Розділові знаки і символи замінюємо пробілом, щоб не склеювати слова
+    return "".join(
+        " " if unicodedata.category(char)[0] in ("P", "S") else char
+        for char in text
+    )
+
+def _fold_lookalikes(word):
+    if _CYRILLIC_RE.search(word) and _LATIN_RE.search(word):
+        return word.translate(LATIN_TO_CYRILLIC)
+    return word
+
+def normalize_query(query, fold_lookalikes=FOLD_LOOKALIKES):
+    """
+    Приводить пошуковий запит до канонічної форми для ключа кешу
+
+    "Матрица", " матрица ", "МАТРИЦА!" і "матрица" з ё/е дають однаковий результат
+
+    Args:
+        query (str): Запит користувача
+        fold_lookalikes (bool): Замінювати латинські літери-двійники в кириличних словах
+
+    Returns:
+        str: Нормалізований запит (порожній рядок, якщо в запиті немає слів)
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = text.replace("ё", "е")
+    text = _strip_punctuation(text)
+    words = _WHITESPACE_RE.split(text.strip())
+    if fold_lookalikes:
+        words = [_fold_lookalikes(word) for word in words]
+    return " ".join(word for word in words if word)
+
+def query_cache_key(query):
+    """
+    Повертає ключ кешу для запиту (запит без слів лишається як є)
+    """
+    return normalize_query(query) or query.strip().lower()
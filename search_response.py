@@ -0,0 +1,112 @@
+from movie_search import (
+    search_movie_kinopoisk_api, search_movie_kinopoisk_api_page, enrich_with_details, iter_film_details,
+    multi_source_search, build_direct_search_result, title_index, DETAILS_MAX_FILMS,
+    CACHE_EXPIRY, CACHE_STALE_EXPIRY, ERROR_CACHE_EXPIRY
+)
+from http_utils import cache_headers, RESPONSE_CACHE_TTL
+from search_sources import SOURCE_OK, SOURCE_EMPTY, merge_results
+
+# Спільні правила відповіді /api/search для обох точок входу (api.py та index.py)
+
+def is_provisional_results(results, deadline=None, sources=None):
+    # Пряме посилання замість результатів (можлива помилка API), деталі, що не встигли завантажитися,
+    # відповідь, зібрана наприкінці бюджету часу (частину запитів могло бути пропущено),
+    # або результати без відповіді API (лише зі сторінки пошуку)
+    if results and results[0].get("is_direct_search"):
+        return True
+    if deadline is not None and deadline.exhausted():
+        return True
+    if sources and sources.get("api") not in (SOURCE_OK, SOURCE_EMPTY):
+        return True
+    return any("details" in result and result["details"] is None for result in results)
+
+def search_cache_headers(results, etag, deadline=None, sources=None):
+    # Тимчасову відповідь кешуємо недовго
+    if is_provisional_results(results, deadline, sources):
+        return cache_headers(etag, ERROR_CACHE_EXPIRY, ERROR_CACHE_EXPIRY)
+    return cache_headers(etag, CACHE_EXPIRY, CACHE_STALE_EXPIRY - CACHE_EXPIRY)
+
+def search_response_ttl(results, deadline=None, sources=None):
+    if is_provisional_results(results, deadline, sources):
+        return min(ERROR_CACHE_EXPIRY, RESPONSE_CACHE_TTL)
+    return RESPONSE_CACHE_TTL
+
+def search_results(movie_name, pagination=None, with_details=False, deadline=None, multi_source=False):
+    """
+    Результати для /api/search: усі результати або одна сторінка
+
+    Кожен крок (запити сторінок, повтори, деталі) використовує лише час,
+    що лишився в deadline; коли він вичерпаний, повертається те, що вже є,
+    або пряме посилання для пошуку.
+
+    Returns:
+        tuple: (список результатів, додаткові поля відповіді: сторінка або стан джерел)
+    """
+    page_info = {}
+    if pagination:
+        page, limit = pagination
+        page_data = search_movie_kinopoisk_api_page(movie_name, page, limit, deadline)
+        results = page_data.pop("results")
+        page_info = page_data
+    elif multi_source:
+        page = 1
+        results, sources = multi_source_search.search(movie_name, deadline)
+        page_info = {"sources": sources}
+    else:
+        page = 1
+        results = search_movie_kinopoisk_api(movie_name, deadline)
+
+    # Якщо результатів немає, створюємо пряме посилання (лише на першій сторінці)
+    if not results and page == 1:
+        results = [build_direct_search_result(movie_name)]
+    elif with_details:
+        results = enrich_with_details(results, deadline=deadline)
+    return results, page_info
+
+def iter_search_events(movie_name, pagination=None, with_details=False, deadline=None, multi_source=False):
+    """
+    Події потокової відповіді /api/search, щойно вони готові
+
+    У пошуку з кількох джерел результати кожного джерела надсилаються, щойно
+    воно відповіло (без дублікатів, у порядку надходження), а деталі фільмів -
+    окремою подією details, щойно завантажено деталі цього фільму. Заголовки
+    кешування і ETag до початку потоку невідомі, тож потік не кешується.
+
+    Yields:
+        dict: Події start, result (index - номер результату в потоці), details і done
+    """
+    yield {"type": "start", "movie": movie_name}
+
+    page_info = {}
+    streamed = []
+    if multi_source and not pagination:
+        answers = {}
+        for name, source_results in multi_source_search.iter_search(movie_name, deadline):
+            answers[name] = source_results
+            for result in merge_results([streamed, source_results or []])[len(streamed):]:
+                yield {"type": "result", "movie": movie_name, "index": len(streamed), "result": result}
+                streamed.append(result)
+        page_info = {"sources": multi_source_search.statuses(answers)}
+        # Якщо жодне джерело нічого не знайшло, надсилаємо пряме посилання
+        if not streamed:
+            streamed.append(build_direct_search_result(movie_name))
+            yield {"type": "result", "movie": movie_name, "index": 0, "result": streamed[0]}
+    else:
+        # Одне джерело відповідає одним запитом: результати надсилаються разом
+        results, page_info = search_results(movie_name, pagination, deadline=deadline)
+        for result in results:
+            yield {"type": "result", "movie": movie_name, "index": len(streamed), "result": result}
+            streamed.append(result)
+
+    # Деталі надсилаються окремо для кожного фільму, щойно їх завантажено (пряме посилання ID не має)
+    if with_details:
+        positions = {}
+        for position, result in enumerate(streamed[:DETAILS_MAX_FILMS]):
+            if result.get("id"):
+                positions.setdefault(result["id"], []).append(position)
+        for film_id, film_details in iter_film_details(list(positions), deadline=deadline):
+            for position in positions[film_id]:
+                yield {"type": "details", "movie": movie_name, "index": position, "id": film_id, "details": film_details}
+
+    yield {"type": "done", "movie": movie_name, "count": len(streamed), **page_info,
+           "did_you_mean": title_index.did_you_mean(movie_name)}
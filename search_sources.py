@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from upstream import LatencyTracker
+
+# Пошук з кількох джерел: скільки чекати на інші джерела після першої непорожньої відповіді
+SOURCES_MERGE_WAIT = float(os.environ.get('SEARCH_SOURCES_MERGE_WAIT', '0.3'))
+SOURCES_TIMEOUT = float(os.environ.get('SEARCH_SOURCES_TIMEOUT', '8'))  # без бюджету часу запиту
+SOURCES_LATENCY_WINDOW = int(os.environ.get('SEARCH_SOURCES_LATENCY_WINDOW', '200'))
+
+# Стан джерела в одній відповіді
+SOURCE_OK = "ok"
+SOURCE_EMPTY = "empty"
+SOURCE_ERROR = "error"
+SOURCE_PENDING = "pending"  # не встигло відповісти
+
+
+class SourceStats:
+    """
+    Лічильники і затримки одного джерела пошуку
+    """
+
+    def __init__(self, window=SOURCES_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.latency = LatencyTracker(window)
+        self.calls = 0
+        self.ok = 0
+        self.empty = 0
+        self.errors = 0
+        self.wins = 0
+
+    def record(self, status, seconds):
+        self.latency.record(seconds)
+        with self._lock:
+            self.calls += 1
+            if status == SOURCE_OK:
+                self.ok += 1
+            elif status == SOURCE_EMPTY:
+                self.empty += 1
+            else:
+                self.errors += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def stats(self):
+        median = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "ok": self.ok,
+                "empty": self.empty,
+                "errors": self.errors,
+                "wins": self.wins,
+                "success_rate": round(self.ok / self.calls, 4) if self.calls else 0.0,
+                "latency_p50": round(median, 4) if median is not None else None,
+                "latency_p95": round(p95, 4) if p95 is not None else None
+            }
+
+
+class MultiSourceSearch:
+    """
+    Пошук одночасно в кількох джерелах (API, сторінка пошуку Кінопошуку)
+
+    Усі джерела запускаються паралельно. Щойно одне з них повертає непорожні
+    результати, інші чекаються ще не довше merge_wait секунд, після чого
+    відповіді, що встигли, об'єднуються без дублікатів (у порядку пріоритету
+    джерел). Джерела, що не встигли, завершуються у фоні - їх статистика
+    все одно враховується. Так недоступність або ліміти одного джерела не
+    означають порожньої чи повільної відповіді.
+
+    Args:
+        sources (dict): Назва -> функція (movie_name, deadline), що повертає список
+            результатів або кидає виняток; порядок - пріоритет при об'єднанні
+        merge_wait (float): Скільки чекати на інші джерела після першої непорожньої відповіді
+        timeout (float): Максимальний час пошуку, якщо бюджет часу запиту не заданий
+    """
+
+    def __init__(self, sources, merge_wait=SOURCES_MERGE_WAIT, timeout=SOURCES_TIMEOUT):
+        self.sources = sources
+        self.merge_wait = merge_wait
+        self.timeout = timeout
+        self.source_stats = {name: SourceStats() for name in sources}
+
+    def search(self, movie_name, deadline=None):
+        """
+        Шукає фільм у всіх джерелах
+
+        Args:
+            movie_name (str): Назва фільму для пошуку
+            deadline (Deadline): Бюджет часу запиту
+
+        Returns:
+            tuple: (об'єднані результати, стан кожного джерела)
+        """
+        answers = dict(self.iter_search(movie_name, deadline))
+        return merge_results(answers.get(name) or [] for name in self.sources), self.statuses(answers)
+
+    def iter_search(self, movie_name, deadline=None):
+        """
+        Те саме, що search, але віддає відповідь кожного джерела, щойно вона готова
+
+        Yields:
+            tuple: (назва джерела, результати або None, якщо джерело завершилося помилкою)
+        """
+        start = time.monotonic()
+        expires_at = start + (deadline.remaining() if deadline is not None else self.timeout)
+
+        executor = ThreadPoolExecutor(max_workers=len(self.sources))
+        futures = {
+            executor.submit(self._run, name, fn, movie_name, deadline): name
+            for name, fn in self.sources.items()
+        }
+        # Не чекаємо на джерела, що не встигли: вони завершаться у фоні
+        executor.shutdown(wait=False)
+
+        winner = None
+        pending = set(futures)
+        while pending:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                results = future.result()
+                if winner is None and results:
+                    winner = name
+                    self.source_stats[winner].record_win()
+                    expires_at = min(expires_at, time.monotonic() + self.merge_wait)
+                yield name, results
+
+    def statuses(self, answers):
+        """
+        Стан кожного джерела за відповідями, що встигли (назва -> результати або None)
+        """
+        statuses = {}
+        for name in self.sources:
+            if name not in answers:
+                statuses[name] = SOURCE_PENDING
+            elif answers[name] is None:
+                statuses[name] = SOURCE_ERROR
+            else:
+                statuses[name] = SOURCE_OK if answers[name] else SOURCE_EMPTY
+        return statuses
+
+    def _run(self, name, fn, movie_name, deadline):
+        # Повертає результати джерела або None, якщо воно завершилося помилкою
+        start = time.monotonic()
+        try:
+            results = fn(movie_name, deadline)
+        except Exception:
+            self.source_stats[name].record(SOURCE_ERROR, time.monotonic() - start)
+            return None
+        self.source_stats[name].record(SOURCE_OK if results else SOURCE_EMPTY, time.monotonic() - start)
+        return results
+
+    def stats(self):
+        return {name: stats.stats() for name, stats in self.source_stats.items()}
+
+
+def merge_results(result_lists):
+    """
+    Об'єднує списки результатів без дублікатів (за ID фільму, інакше за посиланням)
+    """
+    merged = []
+    seen = set()
+    for results in result_lists:
+        for result in results:
+            key = result.get("id") or result.get("url")
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged
@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+import urllib.parse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import movie_search
+from cache import LRUCache, NegativeCache, SingleFlight
+from film_store import FilmStore
+from title_index import TitleIndex
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeApi:
+    """
+    Замінник api_get: відповідає фільмами за ключовим словом і запам'ятовує запити
+    """
+
+    def __init__(self, films=None, delay_event=None):
+        self.films = films or {}
+        self.calls = []
+        self.delay_event = delay_event
+        self._lock = threading.Lock()
+
+    def __call__(self, url, headers=None, params=None, timeout=None, deadline=None):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        keyword = query["keyword"][0]
+        with self._lock:
+            self.calls.append(keyword)
+        if self.delay_event is not None:
+            self.delay_event.wait(5)
+        return FakeResponse({
+            "films": [
+                {"filmId": film_id, "nameRu": name, "year": "1999", "type": "FILM"}
+                for film_id, name in self.films.get(keyword, [])
+            ],
+            "pagesCount": 1
+        })
+
+
+@pytest.fixture
+def search_state(monkeypatch):
+    """
+    Порожні кеші, сховище фільмів та індекс назв для кожного тесту
+    """
+    monkeypatch.setattr(movie_search, "search_cache", LRUCache(max_entries=100))
+    monkeypatch.setattr(movie_search, "negative_cache", NegativeCache())
+    monkeypatch.setattr(movie_search, "error_cache", NegativeCache())
+    monkeypatch.setattr(movie_search, "film_store", FilmStore())
+    monkeypatch.setattr(movie_search, "title_index", TitleIndex())
+    monkeypatch.setattr(movie_search, "inflight_requests", SingleFlight())
+    return movie_search
+
+
+@pytest.fixture
+def fake_api(monkeypatch, search_state):
+    api = FakeApi()
+    monkeypatch.setattr(movie_search, "api_get", api)
+    return api
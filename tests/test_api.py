@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+
+import pytest
+
+import api
+import http_utils
+import movie_search
+import search_response
+import upstream
+from cache import LRUCache
+from http_utils import NDJSON_MIMETYPE
+from search_sources import MultiSourceSearch
+from upstream import CircuitBreaker
+
+
+@pytest.fixture
+def open_breaker(monkeypatch, search_state):
+    breaker = CircuitBreaker(open_seconds=60)
+    breaker._open(time.time())
+    calls = []
+
+    def fake_http_get(url, *args, **kwargs):
+        calls.append(url)
+        raise AssertionError("запит до API при розімкненому запобіжнику")
+
+    monkeypatch.setattr(upstream, "api_breaker", breaker)
+    monkeypatch.setattr(api, "api_breaker", breaker)
+    monkeypatch.setattr(upstream, "http_get", fake_http_get)
+    return calls
+
+
+def test_open_breaker_goes_straight_to_direct_search(open_breaker):
+    client = api.app.test_client()
+
+    start = time.monotonic()
+    response = client.get("/api/search?movie=Розімкнений запобіжник")
+
+    assert time.monotonic() - start < 0.5
+    assert open_breaker == []
+    assert response.get_json()["results"][0]["is_direct_search"] is True
+    assert client.get("/health").get_json()["circuit_breaker"]["state"] == CircuitBreaker.OPEN
+
+
+def test_open_breaker_serves_stale_cache(open_breaker):
+    film = movie_search.film_store.add("301", "Матрица", "1999", "film")
+    movie_search.search_cache.set("матрица застаріла", {
+        "ids": [film.id],
+        "pages_count": 1,
+        "timestamp": time.time() - movie_search.CACHE_EXPIRY - 1
+    })
+
+    response = api.app.test_client().get("/api/search?movie=Матрица застаріла")
+
+    assert open_breaker == []
+    assert [result["id"] for result in response.get_json()["results"]] == ["301"]
+
+
+def test_plain_json_search_is_cached_and_compressed(fake_api):
+    client = api.app.test_client()
+
+    fake_api.films = {"Інтерстеллар тест": [(str(film_id), f"Інтерстеллар {film_id}") for film_id in range(20)]}
+    headers = {"Accept-Encoding": "gzip"}
+    hits = http_utils.response_cache.stats()["hits"]
+    first = client.get("/api/search?movie=Інтерстеллар тест", headers=headers)
+    second = client.get("/api/search?movie=Інтерстеллар тест", headers=headers)
+
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert second.headers["Content-Encoding"] == "gzip"
+    assert second.get_data() == first.get_data()
+    assert http_utils.response_cache.stats()["hits"] == hits + 1
+    assert fake_api.calls == ["Інтерстеллар тест"]
+
+
+def read_stream(response):
+    # Події потоку по одній, щойно сервер їх надіслав
+    for chunk in response.response:
+        yield json.loads(chunk)
+
+
+def test_stream_sends_first_source_results_before_slow_source(monkeypatch, search_state):
+    release = threading.Event()
+
+    def fast_source(movie_name, deadline):
+        return [{"title": "Дюна", "url": "https://www.sspoisk.ru/film/1/", "id": "1"}]
+
+    def slow_source(movie_name, deadline):
+        release.wait(5)
+        return [
+            {"title": "Дюна", "url": "https://www.sspoisk.ru/film/1/", "id": "1"},
+            {"title": "Дюна 2", "url": "https://www.sspoisk.ru/film/2/", "id": "2"}
+        ]
+
+    monkeypatch.setattr(search_response, "multi_source_search",
+                        MultiSourceSearch({"api": fast_source, "html": slow_source}, merge_wait=5, timeout=5))
+    response = api.app.test_client().get("/api/search?movie=Дюна потік&sources=all",
+                                         headers={"Accept": NDJSON_MIMETYPE}, buffered=False)
+    events = read_stream(response)
+
+    assert "ETag" not in response.headers
+    assert next(events)["type"] == "start"
+    first = next(events)
+    assert (first["type"], first["result"]["id"]) == ("result", "1")
+    assert not release.is_set()
+
+    release.set()
+    rest = list(events)
+    assert [(event["type"], event.get("index")) for event in rest] == [("result", 1), ("done", None)]
+    assert rest[-1]["sources"] == {"api": "ok", "html": "ok"}
+
+
+def test_stream_sends_each_film_details_when_fetched(monkeypatch, fake_api):
+    release = threading.Event()
+    fake_api.films = {"Дюна деталі": [("1", "Дюна"), ("2", "Дюна 2")]}
+
+    def fetch_film_details(film_id, deadline=None):
+        if film_id == "2":
+            release.wait(5)
+        return {"poster": f"https://p/{film_id}.jpg"}
+
+    monkeypatch.setattr(movie_search, "fetch_film_details", fetch_film_details)
+    monkeypatch.setattr(movie_search, "details_cache", LRUCache(max_entries=100))
+    response = api.app.test_client().get("/api/search?movie=Дюна деталі&sources=api&details=1",
+                                         headers={"Accept": NDJSON_MIMETYPE}, buffered=False)
+    events = read_stream(response)
+
+    assert [next(events)["type"] for _ in range(3)] == ["start", "result", "result"]
+    first_details = next(events)
+    assert (first_details["type"], first_details["id"]) == ("details", "1")
+    assert not release.is_set()
+
+    release.set()
+    assert [event["type"] for event in events] == ["details", "done"]
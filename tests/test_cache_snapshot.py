@@ -0,0 +1,33 @@
+from cache import LRUCache
+from film_store import FilmStore
+from title_index import TitleIndex
+
+import movie_search
+
+
+def test_snapshot_warm_start_serves_search_without_api(fake_api, monkeypatch, tmp_path):
+    fake_api.films = {"Дюна": [("409424", "Дюна"), ("507", "Дюна 2")]}
+    movie_search.search_movie_kinopoisk_api("Дюна")
+    snapshot_path = tmp_path / "search_cache.jsonl"
+
+    assert movie_search.export_cache_snapshot(str(snapshot_path)) == 1
+
+    # Холодний старт: порожні кеш пошуку, сховище фільмів та індекс назв
+    monkeypatch.setattr(movie_search, "search_cache", LRUCache(max_entries=100))
+    monkeypatch.setattr(movie_search, "film_store", FilmStore())
+    monkeypatch.setattr(movie_search, "title_index", TitleIndex())
+    assert movie_search.import_cache_snapshot(str(snapshot_path)) == 1
+
+    results = movie_search.search_movie_kinopoisk_api("Дюна")
+
+    assert [result["id"] for result in results] == ["409424", "507"]
+    assert results[0]["url"] == "https://www.sspoisk.ru/film/409424/"
+    assert fake_api.calls == ["Дюна"]
+
+
+def test_snapshot_skips_entries_with_evicted_films(fake_api, tmp_path):
+    fake_api.films = {"Дюна": [("409424", "Дюна")]}
+    movie_search.search_movie_kinopoisk_api("Дюна")
+    movie_search.film_store._films.clear()
+
+    assert movie_search.export_cache_snapshot(str(tmp_path / "search_cache.jsonl")) == 0
@@ -0,0 +1,25 @@
+import pytest
+
+import movie_search
+from query_normalizer import query_cache_key
+
+
+@pytest.mark.parametrize("query", ["1+1", "Spider-Man", "8½", "Кин-дза-дза!"])
+def test_original_query_is_sent_upstream(fake_api, query):
+    fake_api.films = {query: [("1", query)]}
+
+    results = movie_search.search_movie_kinopoisk_api(f"  {query} ")
+
+    assert fake_api.calls == [query]
+    assert [result["id"] for result in results] == ["1"]
+
+
+def test_queries_with_same_key_share_cache_entry(fake_api):
+    fake_api.films = {"Spider-Man": [("838", "Человек-паук")]}
+    assert query_cache_key("Spider-Man") == query_cache_key("spider man")
+
+    movie_search.search_movie_kinopoisk_api("Spider-Man")
+    results = movie_search.search_movie_kinopoisk_api("spider man")
+
+    assert [result["id"] for result in results] == ["838"]
+    assert fake_api.calls == ["Spider-Man"]
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+import movie_search
+from cache import SingleFlight
+
+CALLERS = 20
+
+
+def run_concurrently(fn, callers=CALLERS):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def worker(position):
+        try:
+            results[position] = fn()
+        except Exception as e:
+            errors[position] = e
+
+    threads = [threading.Thread(target=worker, args=(position,)) for position in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while flight.stats()["shared"] < count:
+        assert time.monotonic() < deadline, "не всі виклики дочекалися спільного запиту"
+        time.sleep(0.005)
+
+
+def test_concurrent_identical_searches_make_one_upstream_call(fake_api):
+    release = threading.Event()
+    fake_api.delay_event = release
+    fake_api.films = {"Дюна": [("409424", "Дюна")]}
+
+    threads, results, errors = run_concurrently(lambda: movie_search.search_movie_kinopoisk_api("Дюна"))
+    wait_for_waiters(movie_search.inflight_requests, CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert fake_api.calls == ["Дюна"]
+    assert errors == [None] * CALLERS
+    assert all([result["id"] for result in results] == ["409424"] for results in results)
+
+
+def test_waiters_receive_the_leader_error():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def failing_call():
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    threads, results, errors = run_concurrently(lambda: flight.do("дюна", failing_call))
+    wait_for_waiters(flight, CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+
+def test_waiter_gives_up_after_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("дюна", lambda: release.wait(5)))
+    leader.start()
+    while flight.stats()["in_flight"] == 0:
+        time.sleep(0.005)
+
+    with pytest.raises(TimeoutError):
+        flight.do("дюна", lambda: None, timeout=0.05)
+    release.set()
+    leader.join(5)
@@ -0,0 +1,69 @@
+import movie_search
+from film_store import FilmRecord
+from title_index import TitleIndex
+
+
+def test_unseen_title_is_not_rewritten_to_indexed_one(fake_api):
+    fake_api.films = {
+        "Титаник": [("1", "Титаник")],
+        "Титаны": [("2", "Титаны")]
+    }
+    movie_search.search_movie_kinopoisk_api("Титаник")
+
+    results = movie_search.search_movie_kinopoisk_api("Титаны")
+
+    assert [result["id"] for result in results] == ["2"]
+    assert fake_api.calls == ["Титаник", "Титаны"]
+
+
+def test_corrected_query_is_tried_only_after_empty_original(fake_api):
+    fake_api.films = {"Матрица": [("301", "Матрица")]}
+    movie_search.search_movie_kinopoisk_api("Матрица")
+
+    results = movie_search.search_movie_kinopoisk_api("Матрицв")
+
+    assert [result["id"] for result in results] == ["301"]
+    assert fake_api.calls[:2] == ["Матрица", "Матрицв"]
+
+
+def test_suggest_ranks_whole_prefix_range_by_popularity():
+    index = TitleIndex()
+    for film_id in range(1000):
+        film = FilmRecord(str(film_id), f"Зоряні війни {film_id:04d}", "1999", "film")
+        index.add(film.id, [film.name], film)
+    popular = FilmRecord("9999", "Зоряні війни яскраві", "1977", "film")
+    for _ in range(5):
+        index.add(popular.id, [popular.name], popular)
+
+    suggestions = index.suggest("зоряні", limit=3)
+
+    assert suggestions[0]["id"] == "9999"
+    assert len(suggestions) == 3
+    assert index.suggest("зоряні війни я")[0]["id"] == "9999"
+    assert index.suggest("зоряніх") == []
+
+
+def test_short_prefix_top_list_follows_popularity():
+    index = TitleIndex()
+    for film_id, name in enumerate(["Дюна", "Дім", "Дракула"]):
+        film = FilmRecord(str(film_id), name, "2000", "film")
+        index.add(film.id, [name], film)
+    assert len(index.suggest("д")) == 3
+
+    dracula = FilmRecord("2", "Дракула", "2000", "film")
+    for _ in range(3):
+        index.add(dracula.id, [dracula.name], dracula)
+
+    assert [result["id"] for result in index.suggest("д")][0] == "2"
+
+
+def test_local_index_answers_error_cached_query(fake_api):
+    fake_api.films = {"Матрица": [("301", "Матрица")]}
+    movie_search.search_movie_kinopoisk_api("Матрица")
+    movie_search.search_cache.clear()
+    movie_search.error_cache.add("матрица")
+
+    results = movie_search.search_movie_kinopoisk_api("Матрица")
+
+    assert [result["id"] for result in results] == ["301"]
+    assert fake_api.calls == ["Матрица"]
@@ -0,0 +1,164 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import upstream
+from upstream import ApiKeyPool, CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceededError, RateLimiter, RateLimitedError
+
+
+class OkResponse:
+    status_code = 200
+    headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def api_client(monkeypatch):
+    """
+    Свіжі запобіжник і пул ключів для api_get, http_get без мережі
+    """
+    breaker = CircuitBreaker(min_calls=2, open_seconds=60)
+    pool = ApiKeyPool(["test-key-1"])
+    calls = []
+
+    def fake_http_get(url, headers=None, params=None, timeout=None, deadline=None):
+        calls.append(url)
+        return OkResponse()
+
+    monkeypatch.setattr(upstream, "api_breaker", breaker)
+    monkeypatch.setattr(upstream, "api_key_pool", pool)
+    monkeypatch.setattr(upstream, "http_get", fake_http_get)
+    return breaker, pool, calls
+
+
+def test_open_breaker_rejects_before_taking_key_or_token(api_client):
+    breaker, pool, calls = api_client
+    breaker._open(time.time())
+    api_key = pool.keys[0]
+    api_key.limiter = RateLimiter(rate=2, burst=1, max_wait=1)
+
+    start = time.monotonic()
+    for _ in range(15):
+        with pytest.raises(CircuitOpenError):
+            upstream.api_get("https://example.test/api")
+
+    assert time.monotonic() - start < 0.1
+    assert calls == []
+    assert api_key.requests == 0
+    assert api_key.used_today == 0
+    assert api_key.limiter.acquired == 0
+    assert breaker.stats()["rejected"] == 15
+
+
+def test_half_open_breaker_lets_trial_call_through(api_client):
+    breaker, pool, calls = api_client
+    breaker._open(time.time() - breaker.open_seconds)
+
+    upstream.api_get("https://example.test/api")
+
+    assert len(calls) == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_limiter_honours_retry_after_and_halves_rate():
+    limiter = RateLimiter(rate=10, burst=10, max_wait=0.05)
+    limiter.record_throttled(retry_after=0.5)
+
+    assert limiter.stats()["rate"] == 5
+    assert limiter.wait_time() > 0.4
+    with pytest.raises(RateLimitedError):
+        limiter.acquire()
+
+
+def test_limiter_queues_within_max_wait():
+    limiter = RateLimiter(rate=20, burst=1, max_wait=0.5)
+    limiter.acquire()
+
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert 0.02 < time.monotonic() - start < 0.2
+    assert limiter.stats()["delayed"] == 1
+
+
+def test_breaker_opens_on_failure_rate():
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5)
+
+    def failing_call():
+        raise upstream.requests.exceptions.ConnectionError("down")
+
+    for _ in range(4):
+        with pytest.raises(upstream.requests.exceptions.ConnectionError):
+            breaker.call(failing_call)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(min_calls=3, slow_call_seconds=1, slow_call_rate=0.8)
+    for _ in range(3):
+        breaker.record_success(duration=2)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_failed_trial_call_reopens_breaker():
+    breaker = CircuitBreaker(open_seconds=60)
+    breaker._open(time.time() - breaker.open_seconds)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_deadline_cut_trial_call_does_not_close_breaker(api_client, monkeypatch):
+    breaker, pool, calls = api_client
+    breaker._open(time.time() - breaker.open_seconds)
+
+    def deadline_http_get(url, headers=None, params=None, timeout=None, deadline=None):
+        calls.append(url)
+        raise DeadlineExceededError("Бюджет запиту вичерпано")
+
+    monkeypatch.setattr(upstream, "http_get", deadline_http_get)
+    with pytest.raises(DeadlineExceededError):
+        upstream.api_get("https://example.test/api", deadline=Deadline(2))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.stats()["calls_in_window"] == 0
+    # Пробний виклик звільнено: наступний запит знову може перевірити сервіс
+    breaker.check()
+
+
+def test_session_does_not_retry_throttled_response():
+    requests_seen = []
+
+    class ThrottledHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), ThrottledHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        start = time.monotonic()
+        response = upstream.create_session().get(f"http://127.0.0.1:{server.server_port}/api", timeout=5)
+        elapsed = time.monotonic() - start
+    finally:
+        server.shutdown()
+
+    assert response.status_code == 429
+    assert len(requests_seen) == 1
+    assert elapsed < 0.5
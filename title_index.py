@@ -0,0 +1,307 @@
+import bisect
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from fuzzy_matcher import FuzzyMatcher
+from query_normalizer import normalize_query
+
+# Налаштування локального індексу назв
+LOCAL_INDEX_MAX_FILMS = int(os.environ.get('LOCAL_INDEX_MAX_FILMS', '200000'))
+LOCAL_INDEX_MIN_SCORE = float(os.environ.get('LOCAL_INDEX_MIN_SCORE', '0.5'))  # мінімальна схожість результату
+LOCAL_INDEX_CONFIDENCE = float(os.environ.get('LOCAL_INDEX_CONFIDENCE', '0.9'))  # схожість для відповіді без API
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_TOP_PREFIX_LEN = int(os.environ.get('SUGGEST_TOP_PREFIX_LEN', '3'))  # для коротших префіксів - готові топ-списки
+_MAX_CHAR = chr(0x10FFFF)  # більший за будь-який символ: кінець діапазону префікса
+
+def word_suffixes(text):
+    """
+    Повертає назву і всі її "хвости", що починаються з початку слова
+    ("матрица перезагрузка" -> "матрица перезагрузка", "перезагрузка")
+    """
+    words = text.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+def trigrams(text):
+    """
+    Розбиває нормалізований текст на триграми (з пробілами на краях слів)
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _IndexedFilm:
+    __slots__ = ("record", "names", "popularity")
+
+    def __init__(self, record, names):
+        self.record = record  # FilmRecord зі сховища фільмів
+        self.names = names  # [(нормалізована назва, множина триграм)]
+        self.popularity = 0
+
+
+class TitleIndex:
+    """
+    Локальний триграмний індекс назв фільмів, що наповнюється з кожної відповіді API
+
+    Кожен фільм зберігається один раз за його ID (посилання на запис
+    FilmStore, результат будується під час відповіді). Пошук рахує схожість
+    (коефіцієнт Дайса) між триграмами запиту і назвами фільмів, тож
+    знайомі назви знаходяться за мікросекунди без запиту до API.
+
+    Для підказок під час введення індекс також тримає відсортований масив
+    назв (і їхніх хвостів від початку кожного слова), у якому діапазон
+    за префіксом знаходиться двійковим пошуком, а для виправлення опечаток -
+    словник слів з усіх назв (FuzzyMatcher). Діапазон коротких префіксів
+    охоплює більшу частину індексу, тож для них найпопулярніші фільми
+    тримаються готовим топ-списком, що оновлюється зі зростанням популярності.
+
+    Args:
+        max_films (int): Максимальна кількість фільмів (найстаріші витісняються)
+        min_score (float): Мінімальна схожість, з якою фільм потрапляє в результати
+        confidence (float): Схожість найкращого збігу, за якої відповідь вважається надійною
+    """
+
+    def __init__(self, max_films=LOCAL_INDEX_MAX_FILMS, min_score=LOCAL_INDEX_MIN_SCORE,
+                 confidence=LOCAL_INDEX_CONFIDENCE):
+        self.max_films = max_films
+        self.min_score = min_score
+        self.confidence = confidence
+
+        self._lock = threading.Lock()
+        self._films = OrderedDict()  # film_id -> _IndexedFilm
+        self._postings = {}  # триграма -> множина film_id
+        self._prefixes = []  # відсортовані (хвіст назви, film_id, номер слова)
+        self._top = {}  # короткий префікс -> [(ранг, film_id)] найкращих за спаданням рангу
+        self._fuzzy = FuzzyMatcher()
+
+        self.local_hits = 0
+        self.local_misses = 0
+
+    def add(self, film_id, names, record):
+        """
+        Додає або оновлює фільм в індексі
+
+        Args:
+            film_id (str): ID фільму на Кінопошуку
+            names (list): Назви фільму (українська/російська, англійська...)
+            record (FilmRecord): Запис фільму, з якого будується результат пошуку
+        """
+        indexed_names = []
+        for name in names:
+            normalized = normalize_query(name) if name else ""
+            if normalized and all(normalized != existing for existing, _ in indexed_names):
+                indexed_names.append((normalized, trigrams(normalized)))
+        if not indexed_names:
+            return
+
+        with self._lock:
+            film = self._films.get(film_id)
+            if film is not None:
+                self._unindex(film_id, film)
+                popularity = film.popularity
+                old_prefixes = self._short_prefixes(film)
+            else:
+                popularity = 0
+                old_prefixes = {}
+            film = _IndexedFilm(record, indexed_names)
+            film.popularity = popularity + 1
+            self._films[film_id] = film
+            self._films.move_to_end(film_id)
+            for name, grams in indexed_names:
+                self._fuzzy.add_words(name)
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(film_id)
+                for word_pos, suffix in enumerate(word_suffixes(name)):
+                    bisect.insort(self._prefixes, (suffix, film_id, word_pos))
+
+            # Ранг у топ-списках лише зростає, крім префіксів назв, які фільм втратив
+            new_prefixes = self._short_prefixes(film)
+            lost = [prefix for prefix, is_title in old_prefixes.items() if new_prefixes.get(prefix, -1) < is_title]
+            self._drop_top(film_id, lost)
+            self._promote(film_id, film, new_prefixes)
+
+            while len(self._films) > self.max_films:
+                old_id, old_film = self._films.popitem(last=False)
+                self._unindex(old_id, old_film)
+                self._drop_top(old_id, self._short_prefixes(old_film))
+
+    def _short_prefixes(self, film):
+        # Короткі префікси хвостів назв фільму -> чи це початок назви
+        prefixes = {}
+        for name, _ in film.names:
+            for word_pos, suffix in enumerate(word_suffixes(name)):
+                for length in range(1, min(len(suffix), SUGGEST_TOP_PREFIX_LEN) + 1):
+                    prefix = suffix[:length]
+                    prefixes[prefix] = prefixes.get(prefix, False) or word_pos == 0
+        return prefixes
+
+    def _promote(self, film_id, film, prefixes=None):
+        # Фільм, що став популярнішим, займає своє місце в уже побудованих топ-списках
+        if prefixes is None:
+            prefixes = self._short_prefixes(film)
+        for prefix, is_title in prefixes.items():
+            top = self._top.get(prefix)
+            if top is None:
+                continue
+            top = [entry for entry in top if entry[1] != film_id]
+            top.append(((is_title, film.popularity), film_id))
+            top.sort(key=lambda entry: entry[0], reverse=True)
+            self._top[prefix] = top[:SUGGEST_MAX_LIMIT]
+
+    def _drop_top(self, film_id, prefixes):
+        # Топ-список, з якого зник фільм, будується наново при наступній підказці
+        for prefix in prefixes:
+            top = self._top.get(prefix)
+            if top is not None and any(entry[1] == film_id for entry in top):
+                del self._top[prefix]
+
+    def _unindex(self, film_id, film):
+        for name, grams in film.names:
+            self._fuzzy.remove_words(name)
+            for gram in grams:
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(film_id)
+                    if not ids:
+                        del self._postings[gram]
+            for word_pos, suffix in enumerate(word_suffixes(name)):
+                entry = (suffix, film_id, word_pos)
+                pos = bisect.bisect_left(self._prefixes, entry)
+                if pos < len(self._prefixes) and self._prefixes[pos] == entry:
+                    del self._prefixes[pos]
+
+    def search(self, query, limit=20):
+        """
+        Шукає фільми за схожістю назви
+
+        Args:
+            query (str): Запит (буде нормалізований)
+            limit (int): Максимальна кількість результатів
+
+        Returns:
+            tuple: (список результатів, схожість найкращого збігу)
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return [], 0.0
+        query_grams = trigrams(normalized)
+
+        with self._lock:
+            counts = {}
+            for gram in query_grams:
+                for film_id in self._postings.get(gram, ()):
+                    counts[film_id] = counts.get(film_id, 0) + 1
+
+            # Фільм не може набрати min_score, якщо спільних триграм замало
+            min_common = self.min_score * len(query_grams) / 2
+            scored = []
+            for film_id, common in counts.items():
+                if common < min_common:
+                    continue
+                film = self._films[film_id]
+                score = max(
+                    2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+                    for _, grams in film.names
+                )
+                if score >= self.min_score:
+                    scored.append((score, film.popularity, film_id))
+
+            scored.sort(reverse=True)
+            results = [self._films[film_id].record.as_result() for _, _, film_id in scored[:limit]]
+        return results, (scored[0][0] if scored else 0.0)
+
+    def lookup(self, query, limit=20):
+        """
+        Повертає локальні результати, лише якщо індекс упевнений у відповіді
+
+        Returns:
+            list: Результати або None, якщо потрібен запит до API
+        """
+        results, best_score = self.search(query, limit)
+        with self._lock:
+            if results and best_score >= self.confidence:
+                self.local_hits += 1
+                for result in results:
+                    film = self._films.get(result["id"])
+                    if film is not None:
+                        film.popularity += 1
+                        self._promote(result["id"], film)
+                return results
+            self.local_misses += 1
+            return None
+
+    def suggest(self, prefix, limit=10):
+        """
+        Підказки за префіксом назви (або будь-якого слова назви)
+
+        Args:
+            prefix (str): Введений користувачем текст
+            limit (int): Максимальна кількість підказок
+
+        Returns:
+            list: Результати, відсортовані за популярністю
+        """
+        normalized = normalize_query(prefix)
+        if not normalized:
+            return []
+
+        with self._lock:
+            if len(normalized) <= SUGGEST_TOP_PREFIX_LEN and limit <= SUGGEST_MAX_LIMIT:
+                top = self._top.get(normalized)
+                if top is None:
+                    top = self._rank_prefix(normalized, SUGGEST_MAX_LIMIT)
+                    if top:
+                        self._top[normalized] = top
+                best = top[:limit]
+            else:
+                best = self._rank_prefix(normalized, limit)
+            return [self._films[film_id].record.as_result() for _, film_id in best]
+
+    def _rank_prefix(self, normalized, limit):
+        # Ранжуємо весь діапазон префікса, а не перші за алфавітом назви
+        start = bisect.bisect_left(self._prefixes, (normalized,))
+        end = bisect.bisect_left(self._prefixes, (normalized + _MAX_CHAR,), start)
+        matched = {}
+        for pos in range(start, end):
+            _, film_id, word_pos = self._prefixes[pos]
+            # Збіг з початком назви вищий за збіг з початком іншого слова
+            rank = (word_pos == 0, self._films[film_id].popularity)
+            if rank > matched.get(film_id, (False, -1)):
+                matched[film_id] = rank
+        best = heapq.nlargest(limit, matched.items(), key=lambda item: item[1])
+        return [(rank, film_id) for film_id, rank in best]
+
+    def correct(self, query):
+        """
+        Виправляє опечатки в запиті за словами відомих назв
+
+        Returns:
+            str: Нормалізований виправлений запит (або нормалізований запит без змін)
+        """
+        return self._fuzzy.correct(normalize_query(query))
+
+    def did_you_mean(self, query):
+        """
+        Повертає виправлений запит, якщо він відрізняється від введеного, інакше None
+        """
+        normalized = normalize_query(query)
+        corrected = self._fuzzy.correct(normalized)
+        return corrected if corrected != normalized else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.local_misses
+            return {
+                "films": len(self._films),
+                "trigrams": len(self._postings),
+                "prefixes": len(self._prefixes),
+                "top_prefixes": len(self._top),
+                "local_hits": self.local_hits,
+                "local_misses": self.local_misses,
+                "local_hit_ratio": round(self.local_hits / lookups, 4) if lookups else 0.0,
+                "fuzzy": self._fuzzy.stats()
+            }
+
+    def __len__(self):
+        return len(self._films)
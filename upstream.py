@@ -0,0 +1,928 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Налаштування пулу з'єднань до зовнішніх сервісів
+POOL_CONNECTIONS = int(os.environ.get('UPSTREAM_POOL_CONNECTIONS', '10'))  # кількість хостів у пулі
+POOL_MAXSIZE = int(os.environ.get('UPSTREAM_POOL_MAXSIZE', '20'))  # з'єднань на один хост
+CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', '6'))
+MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', '2'))
+RETRY_BACKOFF = 0.2
+
+# Бюджет часу одного запиту до сервісу (з запасом до maxDuration: 10 у vercel.json)
+REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', '8'))
+DEADLINE_MIN_CALL = float(os.environ.get('DEADLINE_MIN_CALL', '0.2'))  # менше цього запит до API не починаємо
+
+# Повторюємо лише ідемпотентні запити і лише на тимчасових помилках сервера
+RETRY_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Помилки, які варто ненадовго запам'ятати: некоректний запит і недоступність сервера
+NEGATIVE_CACHE_STATUSES = (400, 404, 500, 502, 503, 504)
+
+# Налаштування запобіжника (circuit breaker) для API Кінопошуку
+BREAKER_WINDOW = float(os.environ.get('BREAKER_WINDOW', '30'))  # вікно статистики в секундах
+BREAKER_MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS', '10'))
+BREAKER_FAILURE_RATE = float(os.environ.get('BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get('BREAKER_SLOW_CALL_SECONDS', '3'))
+BREAKER_SLOW_CALL_RATE = float(os.environ.get('BREAKER_SLOW_CALL_RATE', '0.8'))
+BREAKER_OPEN_SECONDS = float(os.environ.get('BREAKER_OPEN_SECONDS', '15'))
+
+# Статуси, що свідчать про проблеми на боці сервера (а не в нашому запиті)
+BREAKER_FAILURE_STATUSES = (429, 500, 502, 503, 504)
+
+# Обмеження частоти запитів до API (ліміт ключа)
+RATE_LIMIT = float(os.environ.get('UPSTREAM_RATE_LIMIT', '10'))  # запитів на секунду
+RATE_BURST = float(os.environ.get('UPSTREAM_RATE_BURST', '10'))
+RATE_MAX_WAIT = float(os.environ.get('UPSTREAM_RATE_MAX_WAIT', '2'))  # скільки запит може чекати в черзі
+RATE_LIMIT_RETRIES = int(os.environ.get('UPSTREAM_RATE_LIMIT_RETRIES', '1'))  # повтори після 429
+DEFAULT_RETRY_AFTER = 1.0
+
+# Дубльовані (hedged) запити до API: друга спроба, якщо перша не відповіла
+# за HEDGE_PERCENTILE-й перцентиль недавніх затримок
+HEDGE_ENABLED = os.environ.get('UPSTREAM_HEDGE', '0') == '1'
+HEDGE_PERCENTILE = float(os.environ.get('UPSTREAM_HEDGE_PERCENTILE', '95'))
+HEDGE_MAX_RATE = float(os.environ.get('UPSTREAM_HEDGE_MAX_RATE', '0.05'))  # частка дубльованих запитів
+HEDGE_WINDOW = int(os.environ.get('UPSTREAM_HEDGE_WINDOW', '500'))  # запитів у ковзному вікні
+HEDGE_MIN_SAMPLES = int(os.environ.get('UPSTREAM_HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MIN_DELAY = float(os.environ.get('UPSTREAM_HEDGE_MIN_DELAY', '0.05'))
+
+# Ключі API: список через кому в KINOPOISK_API_KEYS або один ключ у KINOPOISK_API_KEY
+KINOPOISK_API_KEYS = [
+    key.strip()
+    for key in os.environ.get(
+        'KINOPOISK_API_KEYS',
+        os.environ.get('KINOPOISK_API_KEY', '6ca43889-42a5-4ef4-8de7-ab98315826d3')
+    ).split(',')
+    if key.strip()
+]
+API_KEY_DAILY_QUOTA = int(os.environ.get('KINOPOISK_API_DAILY_QUOTA', '0'))  # 0 - без обмеження
+API_KEY_QUARANTINE_SECONDS = float(os.environ.get('KINOPOISK_API_KEY_QUARANTINE', '3600'))
+
+# Статуси, після яких ключ тимчасово виключається з ротації
+KEY_QUARANTINE_STATUSES = (401, 402, 429)
+
+_session = None
+_deadline_session = None
+_session_lock = threading.Lock()
+
+class DeadlineExceededError(TimeoutError):
+    """
+    Запит не виконано, бо бюджет часу запиту вичерпано
+    """
+
+
+class Deadline:
+    """
+    Бюджет часу одного запиту до сервісу
+
+    Створюється в обробнику запиту і передається в кожен виклик API, повтор
+    і крок збагачення, щоб кожен з них використовував лише час, що лишився,
+    а відповідь (хай і неповна) встигла піти до ліміту платформи.
+
+    Args:
+        budget (float): Бюджет у секундах
+    """
+
+    def __init__(self, budget=REQUEST_DEADLINE):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def exhausted(self):
+        return self.remaining() < DEADLINE_MIN_CALL
+
+    def check(self):
+        """
+        Raises:
+            DeadlineExceededError: Якщо часу на ще один запит не лишилося
+        """
+        if self.exhausted():
+            raise DeadlineExceededError(f"Бюджет запиту {self.budget:.1f} с вичерпано")
+
+    def timeout(self, connect=CONNECT_TIMEOUT, read=READ_TIMEOUT):
+        """
+        Таймаути HTTP-запиту, обмежені часом, що лишився
+
+        Returns:
+            tuple: (таймаут з'єднання, таймаут читання)
+        """
+        self.check()
+        remaining = self.remaining()
+        return min(connect, remaining), min(read, remaining)
+
+
+class CachedUpstreamError(Exception):
+    """
+    Запит не виконано, бо такий самий запит нещодавно завершився помилкою
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Запит не виконано, бо запобіжник розімкнено
+    """
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для зовнішнього сервісу зі станами closed / open / half_open
+
+    У стані closed рахує частку помилок і повільних викликів у ковзному вікні.
+    Якщо частка перевищує поріг, запобіжник розмикається (open) і всі виклики
+    одразу завершуються CircuitOpenError. Через open_seconds пропускається
+    один пробний виклик (half_open): успіх замикає запобіжник, помилка знову
+    розмикає.
+
+    Args:
+        window (float): Ширина ковзного вікна в секундах
+        min_calls (int): Мінімальна кількість викликів у вікні для рішення
+        failure_rate (float): Частка помилок, за якої запобіжник розмикається
+        slow_call_seconds (float): Виклик довший за цей час вважається повільним
+        slow_call_rate (float): Частка повільних викликів, за якої запобіжник розмикається
+        open_seconds (float): Скільки часу запобіжник залишається розімкненим
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+                 slow_call_rate=BREAKER_SLOW_CALL_RATE, open_seconds=BREAKER_OPEN_SECONDS):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._calls = deque()  # (час, успіх, повільний)
+
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.time())
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """
+        Перевіряє, чи можна зараз виконати виклик
+        """
+        with self._lock:
+            state = self._current_state(time.time())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """
+        Швидка перевірка перед підготовкою виклику (ключ API, токен обмежувача)
+
+        На відміну від allow_request, не резервує пробний виклик стану half_open:
+        його резервує сам call.
+
+        Raises:
+            CircuitOpenError: Якщо виклик зараз буде відхилено
+        """
+        with self._lock:
+            state = self._current_state(time.time())
+            if state == self.CLOSED or (state == self.HALF_OPEN and not self._trial_in_flight):
+                return
+            self.rejected += 1
+        raise CircuitOpenError("Запобіжник API розімкнено, запит пропущено")
+
+    def record_success(self, duration):
+        now = time.time()
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if slow:
+                    self._open(now)
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                return
+            self._record(now, True, slow)
+
+    def record_failure(self):
+        now = time.time()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._record(now, False, False)
+
+    def record_ignored(self):
+        # Виклик, перерваний бюджетом запиту, нічого не каже про стан сервісу:
+        # не рахуємо його, а в стані half_open дозволяємо новий пробний виклик
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def call(self, fn):
+        """
+        Виконує fn під захистом запобіжника
+
+        Raises:
+            CircuitOpenError: Якщо запобіжник розімкнено
+        """
+        if not self.allow_request():
+            raise CircuitOpenError("Запобіжник API розімкнено, запит пропущено")
+        start = time.time()
+        try:
+            result = fn()
+        except DeadlineExceededError:
+            self.record_ignored()
+            raise
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.record_failure()
+            else:
+                self.record_success(time.time() - start)
+            raise
+        self.record_success(time.time() - start)
+        return result
+
+    def _record(self, now, ok, slow):
+        self._calls.append((now, ok, slow))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+        total = len(self._calls)
+        if self._state != self.CLOSED or total < self.min_calls:
+            return
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow_calls = sum(1 for _, _, slow in self._calls if slow)
+        if failures / total >= self.failure_rate or slow_calls / total >= self.slow_call_rate:
+            self._open(now)
+
+    def _open(self, now):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._trial_in_flight = False
+        self._calls.clear()
+        self.opened += 1
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            total = len(self._calls)
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+            return {
+                "state": self._current_state(now),
+                "calls_in_window": total,
+                "failure_rate": round(failures / total, 4) if total else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+
+
+class RateLimitedError(Exception):
+    """
+    Запит не виконано, бо черга очікування на ліміт частоти занадто довга
+    """
+
+
+class RateLimiter:
+    """
+    Потокобезпечне відро токенів з адаптивною частотою
+
+    Кожен запит резервує токен і, якщо токенів немає, чекає своєї черги, але
+    не довше max_wait. Після відповіді 429 частота зменшується вдвічі, а всі
+    запити чекають стільки, скільки вказано в Retry-After; після кожного
+    успішного запиту частота поступово повертається до rate. Так пропускна
+    здатність встановлюється трохи нижче квоти, а не коливається.
+
+    Args:
+        rate (float): Максимальна частота запитів на секунду
+        burst (float): Максимальна кількість токенів у відрі
+        max_wait (float): Максимальний час очікування в черзі в секундах
+        min_rate (float): Мінімальна частота після зменшень
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_wait=RATE_MAX_WAIT, min_rate=None):
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.burst = burst
+        self.max_wait = max_wait
+        self.increase_step = rate / 50
+
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def wait_time(self):
+        """
+        Скільки секунд довелося б чекати на токен зараз
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(self._blocked_until - now, 0.0)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self._rate)
+            return wait
+
+    def acquire(self, timeout=None):
+        """
+        Резервує токен і чекає, поки настане його черга
+
+        Raises:
+            RateLimitedError: Якщо чекати довелося б довше за timeout
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(self._blocked_until - now, 0.0)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self._rate)
+            if wait > timeout:
+                self.rejected += 1
+                raise RateLimitedError(f"Ліміт запитів до API вичерпано, очікування {wait:.2f} с")
+            self._tokens -= 1
+            self.acquired += 1
+            if wait > 0:
+                self.delayed += 1
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def record_throttled(self, retry_after=None):
+        """
+        Реагує на відповідь 429: зменшує частоту і блокує запити на retry_after секунд
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._rate = max(self.min_rate, self._rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            self._blocked_until = max(self._blocked_until, now + (retry_after or DEFAULT_RETRY_AFTER))
+            self.throttled += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self._rate, 3),
+                "max_rate": self.max_rate,
+                "blocked_for": round(max(self._blocked_until - time.monotonic(), 0.0), 3),
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "rejected": self.rejected,
+                "throttled": self.throttled
+            }
+
+
+class ApiKey:
+    """
+    Ключ API з власним обмежувачем частоти і лічильниками використання
+    """
+
+    def __init__(self, key, daily_quota=API_KEY_DAILY_QUOTA):
+        self.key = key
+        self.daily_quota = daily_quota
+        self.limiter = RateLimiter()
+        self.requests = 0
+        self.used_today = 0
+        self.day = time.gmtime().tm_yday
+        self.errors = {}
+        self.quarantined_until = 0.0
+
+    @property
+    def masked(self):
+        return f"{self.key[:4]}...{self.key[-4:]}" if len(self.key) > 8 else "***"
+
+    def is_available(self, now):
+        if now < self.quarantined_until:
+            return False
+        return not self.daily_quota or self.used_today < self.daily_quota
+
+    def stats(self, now):
+        return {
+            "key": self.masked,
+            "requests": self.requests,
+            "used_today": self.used_today,
+            "daily_quota": self.daily_quota or None,
+            "errors": dict(self.errors),
+            "quarantined_for": round(max(self.quarantined_until - now, self.limiter.wait_time(), 0.0), 1),
+            "rate_limiter": self.limiter.stats()
+        }
+
+
+class ApiKeyPool:
+    """
+    Пул ключів API: запити розподіляються на найменш використаний доступний
+    ключ, а ключі з відповідями 401/402/429 тимчасово виключаються
+
+    Args:
+        keys (list): Список ключів API
+        daily_quota (int): Добова квота одного ключа (0 - без обмеження)
+        quarantine_seconds (float): Час виключення ключа після 401/402
+            (після 429 ключ блокується на час Retry-After)
+    """
+
+    def __init__(self, keys, daily_quota=API_KEY_DAILY_QUOTA, quarantine_seconds=API_KEY_QUARANTINE_SECONDS):
+        self.keys = [ApiKey(key, daily_quota) for key in keys]
+        self.quarantine_seconds = quarantine_seconds
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Вибирає ключ для наступного запиту і чекає на його ліміт частоти
+
+        Args:
+            timeout (float): Максимальний час очікування в черзі (None - max_wait обмежувача)
+
+        Raises:
+            RateLimitedError: Якщо немає доступних ключів або черга занадто довга
+        """
+        now = time.time()
+        today = time.gmtime(now).tm_yday
+        with self._lock:
+            for api_key in self.keys:
+                if api_key.day != today:
+                    api_key.day = today
+                    api_key.used_today = 0
+            candidates = sorted(
+                (api_key for api_key in self.keys if api_key.is_available(now)),
+                key=lambda api_key: api_key.used_today
+            )
+        if not candidates:
+            raise RateLimitedError("Немає доступних ключів API")
+
+        # Спершу шукаємо ключ, який не змусить чекати, інакше стаємо в чергу до найменш використаного
+        for api_key in candidates:
+            try:
+                api_key.limiter.acquire(timeout=0)
+                break
+            except RateLimitedError:
+                continue
+        else:
+            api_key = min(candidates, key=lambda api_key: api_key.limiter.wait_time())
+            api_key.limiter.acquire(timeout)
+
+        with self._lock:
+            api_key.requests += 1
+            api_key.used_today += 1
+        return api_key
+
+    def record_error(self, api_key, status_code, retry_after=None):
+        with self._lock:
+            api_key.errors[status_code] = api_key.errors.get(status_code, 0) + 1
+            if status_code != 429:
+                api_key.quarantined_until = max(api_key.quarantined_until, time.time() + self.quarantine_seconds)
+        if status_code == 429:
+            # Після 429 ключ блокується його ж обмежувачем на час Retry-After
+            api_key.limiter.record_throttled(retry_after)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                "keys": len(self.keys),
+                "available": sum(1 for api_key in self.keys if api_key.is_available(now)),
+                "usage": [api_key.stats(now) for api_key in self.keys]
+            }
+
+
+class LatencyTracker:
+    """
+    Затримки останніх успішних запитів для онлайн-оцінки перцентилів
+
+    Args:
+        window (int): Скільки останніх вимірювань зберігати
+    """
+
+    def __init__(self, window=HEDGE_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self._sorted = None
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._sorted = None
+
+    def percentile(self, percent):
+        """
+        Returns:
+            float: percent-й перцентиль затримки в секундах або None, якщо вимірювань немає
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            # Вікно невелике, тож відсортовану копію достатньо оновлювати після змін
+            if self._sorted is None:
+                self._sorted = sorted(self._samples)
+            return self._sorted[min(int(percent / 100 * len(self._sorted)), len(self._sorted) - 1)]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class Hedger:
+    """
+    Дубльовані (hedged) запити для зменшення хвоста затримок
+
+    Якщо перша спроба не відповіла за percentile-й перцентиль недавніх
+    затримок, надсилається друга така сама. Перемагає перша успішна
+    відповідь; спроба, що програла, скасовується, якщо ще не почалася, а
+    інакше її відповідь закривається, щойно надійде. Частка дубльованих
+    запитів у ковзному вікні не перевищує max_rate, тож квота API не
+    подвоюється. Вимкнений Hedger лише вимірює затримки.
+
+    Args:
+        enabled (bool): Чи надсилати другі спроби
+        percentile (float): Перцентиль затримки, після якого надсилається друга спроба
+        max_rate (float): Максимальна частка дубльованих запитів
+        window (int): Ширина ковзного вікна (запитів)
+        min_samples (int): Мінімальна кількість вимірювань для оцінки перцентиля
+        min_delay (float): Мінімальна затримка перед другою спробою в секундах
+        max_workers (int): Кількість потоків для спроб
+    """
+
+    def __init__(self, enabled=HEDGE_ENABLED, percentile=HEDGE_PERCENTILE, max_rate=HEDGE_MAX_RATE,
+                 window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES, min_delay=HEDGE_MIN_DELAY,
+                 max_workers=POOL_MAXSIZE * 2):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.latency = LatencyTracker(window)
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._recent = deque(maxlen=window)  # чи дублювався кожен з останніх запитів
+        self._recent_hedged = 0
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.capped = 0
+
+    def delay(self):
+        """
+        Скільки чекати на першу спробу перед другою (None - замало вимірювань)
+        """
+        if len(self.latency) < self.min_samples:
+            return None
+        return max(self.latency.percentile(self.percentile), self.min_delay)
+
+    def call(self, fn, prepare_hedge, deadline=None):
+        """
+        Виконує fn, за потреби дублюючи запит
+
+        Args:
+            fn: Перша спроба
+            prepare_hedge: Повертає функцію другої спроби або None, якщо її не можна надіслати зараз
+            deadline (Deadline): Бюджет часу запиту (друга спроба - лише якщо на неї лишився час)
+
+        Returns:
+            Результат першої успішної спроби (якщо обидві невдалі - помилка першої)
+        """
+        delay = self.delay() if self.enabled else None
+        if delay is None or (deadline is not None and delay + DEADLINE_MIN_CALL >= deadline.remaining()):
+            self._record_call(False)
+            return self._attempt(fn)
+
+        primary = self._get_executor().submit(self._attempt, fn)
+        done, _ = wait([primary], timeout=delay)
+        hedge_fn = None if done else self._start_hedge(prepare_hedge)
+        if hedge_fn is None:
+            if done:
+                self._record_call(False)
+            return primary.result()
+
+        backup = self._get_executor().submit(self._attempt, hedge_fn)
+        return self._first_success(primary, backup)
+
+    def _attempt(self, fn):
+        start = time.monotonic()
+        result = fn()
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _start_hedge(self, prepare_hedge):
+        with self._lock:
+            if self._recent_hedged + 1 > self.max_rate * (len(self._recent) + 1):
+                self.capped += 1
+                self._append(False)
+                return None
+            hedge_fn = prepare_hedge()
+            self._append(hedge_fn is not None)
+            return hedge_fn
+
+    def _first_success(self, primary, backup):
+        winner = None
+        pending = {primary, backup}
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+
+        for future in (primary, backup):
+            if future is not winner and not future.cancel():
+                future.add_done_callback(_close_result)
+        if winner is None:
+            return primary.result()
+        if winner is backup:
+            with self._lock:
+                self.hedge_wins += 1
+        return winner.result()
+
+    def _record_call(self, hedged):
+        with self._lock:
+            self._append(hedged)
+
+    def _append(self, hedged):
+        if len(self._recent) == self._recent.maxlen and self._recent[0]:
+            self._recent_hedged -= 1
+        self._recent.append(hedged)
+        self._recent_hedged += hedged
+        self.calls += 1
+        self.hedged += hedged
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+        return self._executor
+
+    def stats(self):
+        delay = self.delay()
+        median = self.latency.percentile(50)
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "samples": len(self.latency),
+                "latency_p50": round(median, 4) if median is not None else None,
+                "hedge_delay": round(delay, 4) if delay is not None else None,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "capped": self.capped,
+                "hedge_rate": round(self._recent_hedged / len(self._recent), 4) if self._recent else 0.0
+            }
+
+
+def _close_result(future):
+    # Відповідь спроби, що програла, нікому не потрібна - звільняємо з'єднання
+    if not future.cancelled() and future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if close is not None:
+            close()
+
+
+# Спільний запобіжник для всіх запитів до API Кінопошуку
+api_breaker = CircuitBreaker()
+
+# Спільні дубльовані запити (і вимірювання затримок) до API Кінопошуку
+api_hedger = Hedger()
+
+# Спільний пул ключів API Кінопошуку
+api_key_pool = ApiKeyPool(KINOPOISK_API_KEYS)
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=MAX_RETRIES):
+    """
+    Створює HTTP-сесію з пулом keep-alive з'єднань і повторами запитів
+
+    Args:
+        pool_connections (int): Кількість пулів (окремих хостів), що зберігаються
+        pool_maxsize (int): Максимальна кількість з'єднань до одного хоста
+        max_retries (int): Кількість повторів ідемпотентних запитів
+
+    Returns:
+        requests.Session: Налаштована сесія
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=0.2,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        # 429 з Retry-After не повторюємо тут з тим самим ключем: його обробляє api_get
+        # (блокування ключа в обмежувачі і ротація ключів)
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """
+    Повертає спільну сесію, яка живе весь час роботи процесу
+    (і між запитами в "теплому" serverless-екземплярі)
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+def get_deadline_session():
+    """
+    Повертає спільну сесію без вбудованих повторів: запити з бюджетом часу
+    повторюються в http_get, лише поки на повтор вистачає часу
+    """
+    global _deadline_session
+    if _deadline_session is None:
+        with _session_lock:
+            if _deadline_session is None:
+                _deadline_session = create_session(max_retries=0)
+    return _deadline_session
+
+def http_get(url, headers=None, params=None, timeout=None, deadline=None):
+    """
+    Виконує GET-запит через спільний пул з'єднань
+
+    Args:
+        url (str): Адреса запиту
+        headers (dict): Заголовки запиту
+        params (dict): Параметри рядка запиту
+        timeout (tuple): (таймаут з'єднання, таймаут читання) в секундах
+        deadline (Deadline): Бюджет часу запиту (None - без обмеження)
+
+    Returns:
+        requests.Response: Відповідь сервера
+
+    Raises:
+        DeadlineExceededError: Якщо бюджет вичерпано до першої спроби
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if deadline is None:
+        return get_session().get(url, headers=headers, params=params, timeout=timeout)
+
+    session = get_deadline_session()
+    for attempt in range(MAX_RETRIES + 1):
+        request_timeout = deadline.timeout(*timeout)
+        try:
+            response = session.get(url, headers=headers, params=params, timeout=request_timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Таймаут, скорочений бюджетом, - це не збій сервісу (і не кешується як помилка)
+            if isinstance(e, requests.exceptions.Timeout) and tuple(request_timeout) != tuple(timeout):
+                raise DeadlineExceededError(f"Бюджет запиту {deadline.budget:.1f} с вичерпано") from e
+            error, response = e, None
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            error = None
+
+        # Повторюємо, лише якщо після паузи лишиться час на сам запит
+        backoff = RETRY_BACKOFF * (2 ** attempt)
+        if attempt == MAX_RETRIES or deadline.remaining() - backoff < DEADLINE_MIN_CALL:
+            if error is not None:
+                raise error
+            return response
+        time.sleep(backoff)
+
+def api_get(url, headers=None, params=None, timeout=None, deadline=None):
+    """
+    Виконує GET-запит до API через запобіжник і перевіряє статус відповіді
+
+    Ключ API (заголовок X-API-KEY) вибирається з пулу ключів, а запит чекає
+    своєї черги в обмежувачі частоти цього ключа. Після відповіді 401/402/429
+    ключ виключається з ротації, а запит повторюється з іншим ключем.
+    Повільну спробу може продублювати api_hedger (друга спроба бере свій ключ з пулу).
+    З бюджетом часу (deadline) черга, повтори і таймаути обмежені часом, що лишився.
+
+    Raises:
+        DeadlineExceededError: Якщо бюджет часу вичерпано
+        CircuitOpenError: Якщо запобіжник розімкнено
+        RateLimitedError: Якщо ліміт запитів вичерпано
+        requests.exceptions.RequestException: Якщо запит завершився помилкою
+    """
+    def send(request_headers):
+        response = http_get(url, headers=request_headers, params=params, timeout=timeout, deadline=deadline)
+        response.raise_for_status()
+        return response
+
+    def request(api_key):
+        request_headers = dict(headers or {})
+        request_headers["X-API-KEY"] = api_key.key
+        try:
+            response = api_breaker.call(lambda: send(request_headers))
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code in KEY_QUARANTINE_STATUSES:
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                api_key_pool.record_error(api_key, e.response.status_code, retry_after)
+            raise
+        api_key.limiter.record_success()
+        return response
+
+    def prepare_hedge():
+        # Друга спроба не чекає в черзі обмежувача: немає вільного токена - немає спроби
+        try:
+            api_breaker.check()
+            hedge_key = api_key_pool.acquire(0)
+        except (CircuitOpenError, RateLimitedError):
+            return None
+        return lambda: request(hedge_key)
+
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        max_wait = None
+        if deadline is not None:
+            deadline.check()
+            max_wait = min(RATE_MAX_WAIT, deadline.remaining() - DEADLINE_MIN_CALL)
+        # Розімкнений запобіжник відхиляє запит до того, як той займе ключ і токен обмежувача
+        api_breaker.check()
+        api_key = api_key_pool.acquire(max_wait)
+        try:
+            return api_hedger.call(lambda: request(api_key), prepare_hedge, deadline)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code not in KEY_QUARANTINE_STATUSES:
+                raise
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+
+def parse_retry_after(value):
+    """
+    Розбирає заголовок Retry-After (секунди або HTTP-дата)
+
+    Returns:
+        float: Кількість секунд очікування або None
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def is_upstream_failure(error):
+    """
+    Перевіряє, чи свідчить помилка про проблеми зовнішнього сервісу
+    """
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in BREAKER_FAILURE_STATUSES
+    return isinstance(error, requests.exceptions.RequestException)
+
+def is_cacheable_error(error):
+    """
+    Перевіряє, чи можна кешувати помилку запиту як "негативну" відповідь
+    """
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in NEGATIVE_CACHE_STATUSES
+    return False